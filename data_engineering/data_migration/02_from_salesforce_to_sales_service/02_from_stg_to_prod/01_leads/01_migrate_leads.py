@@ -6,23 +6,38 @@ Key improvements:
 2. Batch duplicate checking with indexed queries
 3. Connection pool with auto-reconnect
 4. Checkpoint system for resume capability
-5. Parallel processing option
+5. Pipelined mode (--pipeline): a reader thread prefetches pages while
+   writer threads insert batches over their own connections
+6. Sharded mode (--shards N): the leadId range is split into N ranges, each
+   migrated by its own process with its own checkpoint
+7. Adaptive batch size (--adaptive-batch-size): see batch_sizing.py
 """
 
 import argparse
+import hashlib
 import logging
+import multiprocessing
 import sys
 import csv
+import queue
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, Iterable, List, Optional, Tuple, Set
+import numpy as np
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSCursor, SSDictCursor
 import os
 from dotenv import load_dotenv
 import json
 from pathlib import Path
 from collections import defaultdict
 
+# batch_sizing.py is shared by the migrations in 02_from_stg_to_prod
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from batch_sizing import AdaptiveBatchSize, committed_rows  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
@@ -58,10 +73,221 @@ MYSQL_CONFIGS = {
 }
 
 
+class HashIndex:
+    """
+    Compact membership index for the destination's leadIds and phones
+    
+    Keys are stored as sorted 64-bit hashes in a NumPy array (8 bytes per key
+    instead of ~100 for a str in a set) and looked up with binary search.
+    Keys added during the run go to a small pending set that is merged into the
+    array once it reaches MERGE_THRESHOLD. With 64-bit hashes, checking 10M
+    keys against 10M stored ones has about a 1 in 200,000 chance of a single
+    false positive.
+    """
+    
+    MERGE_THRESHOLD = 200000
+    
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        self._hashes = np.unique(hashes) if hashes is not None else np.empty(0, dtype=np.uint64)
+        self._pending: Set[int] = set()
+    
+    @staticmethod
+    def hash_key(value) -> int:
+        return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'little')
+    
+    @classmethod
+    def hash_keys(cls, values: Iterable) -> np.ndarray:
+        return np.fromiter((cls.hash_key(value) for value in values), dtype=np.uint64)
+    
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._pending)
+    
+    def __contains__(self, value) -> bool:
+        return bool(self.contains_many([value])[0])
+    
+    @property
+    def nbytes(self) -> int:
+        return self._hashes.nbytes
+    
+    def contains_many(self, values: List) -> np.ndarray:
+        """Boolean mask of which values are in the index"""
+        hashes = self.hash_keys(values)
+        positions = np.searchsorted(self._hashes, hashes)
+        found = np.zeros(len(hashes), dtype=bool)
+        in_range = positions < len(self._hashes)
+        found[in_range] = self._hashes[positions[in_range]] == hashes[in_range]
+        if self._pending:
+            found |= np.fromiter((h in self._pending for h in hashes.tolist()), dtype=bool, count=len(hashes))
+        return found
+    
+    def add(self, value):
+        self.add_many([value])
+    
+    def add_many(self, values: Iterable):
+        self._pending.update(self.hash_keys(values).tolist())
+        if len(self._pending) >= self.MERGE_THRESHOLD:
+            new = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+            self._hashes = np.union1d(self._hashes, new)
+            self._pending.clear()
+    
+    @classmethod
+    def from_query(cls, conn: pymysql.Connection, query: str, label: str,
+                   fetch_size: int = 100000) -> 'HashIndex':
+        """Build an index from the first column of a query, streamed with an unbuffered SSCursor"""
+        chunks = []
+        count = 0
+        with conn.cursor(SSCursor) as cursor:
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                chunks.append(cls.hash_keys(row[0] for row in rows))
+                count += len(rows)
+                if count % 1000000 < fetch_size:
+                    logger.info(f"  Loaded {count:,} existing {label}...")
+        
+        index = cls(np.concatenate(chunks) if chunks else None)
+        logger.info(f"[OK] Loaded {len(index):,} existing {label} into memory ({index.nbytes / 1024 / 1024:.1f} MB)")
+        return index
+
+
+class LeadWriter:
+    """Writes prepared lead rows to the destination table; subclasses choose the statement shape"""
+    
+    name = None
+    
+    def __init__(self, table: str):
+        self.table = table
+    
+    def write(self, conn: pymysql.Connection, columns: List[str], rows: List[tuple]) -> int:
+        """Insert rows (tuples in `columns` order) without committing; returns rows inserted"""
+        raise NotImplementedError
+
+
+class ExecutemanyWriter(LeadWriter):
+    """cursor.executemany with one-row VALUES, leaving any batching to PyMySQL"""
+    
+    name = 'executemany'
+    
+    def write(self, conn: pymysql.Connection, columns: List[str], rows: List[tuple]) -> int:
+        query = f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        with conn.cursor() as cursor:
+            rows_affected = cursor.executemany(query, rows)
+        return rows_affected if rows_affected else len(rows)
+
+
+class MultiRowInsertWriter(LeadWriter):
+    """
+    Explicit INSERT ... VALUES (...),(...) statements, each as large as the
+    server's max_allowed_packet allows
+    """
+    
+    name = 'multirow'
+    
+    # Share of max_allowed_packet a statement may use, leaving room for protocol overhead
+    PACKET_HEADROOM = 0.9
+    
+    def __init__(self, table: str):
+        super().__init__(table)
+        self.max_statement_bytes = None
+    
+    def _statement_limit(self, conn: pymysql.Connection) -> int:
+        if self.max_statement_bytes is None:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT @@max_allowed_packet AS max_allowed_packet")
+                row = cursor.fetchone()
+            max_allowed_packet = int(row['max_allowed_packet'] if isinstance(row, dict) else row[0])
+            self.max_statement_bytes = int(max_allowed_packet * self.PACKET_HEADROOM)
+            logger.info(f"[WRITER] max_allowed_packet={max_allowed_packet:,} bytes, "
+                        f"statements capped at {self.max_statement_bytes:,} bytes")
+        return self.max_statement_bytes
+    
+    def write(self, conn: pymysql.Connection, columns: List[str], rows: List[tuple]) -> int:
+        limit = self._statement_limit(conn)
+        prefix = f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES "
+        prefix_bytes = len(prefix.encode('utf-8'))
+        
+        inserted = 0
+        values = []
+        size = prefix_bytes
+        with conn.cursor() as cursor:
+            for row in rows:
+                literal = conn.escape(row)
+                literal_bytes = len(literal.encode('utf-8')) + 1  # separating comma
+                if prefix_bytes + literal_bytes > limit:
+                    raise ValueError(f"A single row ({literal_bytes:,} bytes) exceeds max_allowed_packet")
+                if values and size + literal_bytes > limit:
+                    inserted += cursor.execute(prefix + ','.join(values))
+                    values = []
+                    size = prefix_bytes
+                values.append(literal)
+                size += literal_bytes
+            if values:
+                inserted += cursor.execute(prefix + ','.join(values))
+        return inserted
+
+
+class LoadDataWriter(LeadWriter):
+    """
+    LOAD DATA LOCAL INFILE from a generated TSV file, which PyMySQL streams to
+    the server in chunks. Needs local_infile=ON on the server.
+    
+    LOAD DATA LOCAL turns duplicate-key and conversion errors into warnings and
+    skips the row, so a short row count is raised as an error here.
+    """
+    
+    name = 'load-data'
+    
+    @staticmethod
+    def _tsv_field(value) -> str:
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        text = str(value)
+        return (text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+                .replace('\r', '\\r').replace('\0', '\\0'))
+    
+    def write(self, conn: pymysql.Connection, columns: List[str], rows: List[tuple]) -> int:
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', suffix='.tsv',
+                                         prefix='leads_', delete=False) as tsv:
+            for row in rows:
+                tsv.write('\t'.join(self._tsv_field(value) for value in row))
+                tsv.write('\n')
+            path = tsv.name
+        
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                    f"({', '.join(columns)})",
+                    (path,)
+                )
+                loaded = cursor.rowcount
+                if loaded != len(rows):
+                    cursor.execute("SHOW WARNINGS LIMIT 5")
+                    warnings = cursor.fetchall()
+                    raise pymysql.err.DataError(f"LOAD DATA loaded {loaded} of {len(rows)} rows: {warnings}")
+            return loaded
+        finally:
+            os.unlink(path)
+
+
+WRITERS = {writer.name: writer for writer in (MultiRowInsertWriter, ExecutemanyWriter, LoadDataWriter)}
+
+
 class LeadMigration:
     def __init__(self, staging_config: Dict, destination_config: Dict, dry_run: bool = False, 
                  batch_size: int = 1000, limit: Optional[int] = None, disable_fk_checks: bool = False,
-                 checkpoint_file: str = "migration_checkpoint.json", resume: bool = False):
+                 checkpoint_file: str = "migration_checkpoint.json", resume: bool = False,
+                 writer: str = MultiRowInsertWriter.name, pipeline: bool = False, workers: int = 2,
+                 prefetch_batches: int = 4, shard: Optional[Dict] = None,
+                 indexes: Optional[Dict[str, HashIndex]] = None, adaptive_batch_size: bool = False,
+                 target_commit_seconds: float = 2.0, max_batch_size: int = 50000):
         """
         Initialize migration manager with performance optimizations
         
@@ -69,11 +295,21 @@ class LeadMigration:
             staging_config: Staging database connection config
             destination_config: Destination database connection config
             dry_run: If True, no data will be written to destination
-            batch_size: Number of records to process per batch (recommended: 2000-5000)
+            batch_size: Number of records to process per batch (initial size when adaptive)
             limit: Maximum number of records to migrate (None for all)
             disable_fk_checks: If True, temporarily disable foreign key checks during insert
             checkpoint_file: Path to checkpoint file for resuming
             resume: If True, resume from last checkpoint
+            writer: How batches are inserted: multirow, executemany or load-data (see WRITERS)
+            pipeline: If True, read, filter and insert batches concurrently (see _run_pipelined)
+            workers: Writer threads in pipelined mode, each with its own destination connection
+            prefetch_batches: Pages the pipelined reader may fetch ahead of the filter step
+            shard: leadId range to migrate, from plan_shards (None for the whole table)
+            indexes: Indexes built by the sharded-run coordinator (see run_sharded),
+                used instead of preloading the destination again
+            adaptive_batch_size: If True, resize batches to commit in about target_commit_seconds
+            target_commit_seconds: Commit latency the adaptive batch size aims for
+            max_batch_size: Upper bound for the adaptive batch size
         """
         self.staging_config = staging_config
         self.destination_config = destination_config
@@ -81,10 +317,21 @@ class LeadMigration:
         self.destination_table = destination_config.get('table_name', 'leads')
         self.dry_run = dry_run
         self.batch_size = batch_size
+        # Sizes every fetch; backs off on lock waits and packet errors even when not adaptive
+        self.batch_sizer = AdaptiveBatchSize(batch_size, adaptive=adaptive_batch_size,
+                                             target_seconds=target_commit_seconds,
+                                             max_size=max_batch_size)
         self.limit = limit
         self.disable_fk_checks = disable_fk_checks
         self.checkpoint_file = checkpoint_file
         self.resume = resume
+        self.writer = WRITERS[writer](self.destination_table)
+        self.pipeline = pipeline
+        self.workers = workers
+        self.prefetch_batches = prefetch_batches
+        
+        # Guards stats and the failed-records CSV, which pipelined writer threads share
+        self._lock = threading.RLock()
         
         # Last processed leadId for cursor-based pagination
         self.last_lead_id = None
@@ -102,19 +349,37 @@ class LeadMigration:
         if self.resume:
             self._load_checkpoint()
         
+        # Sharded runs read leadId > lower (or the checkpoint) up to and including upper
+        self.shard = shard
+        self.upper_lead_id = None
+        if shard:
+            if self.last_lead_id is None:
+                self.last_lead_id = shard['lower']
+            self.upper_lead_id = shard['upper']
+        
         # Fields to always exclude from INSERT
         self.excluded_fields = []
         
         # CSV for failed records
-        self.failed_csv_path = f'failed_leads_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        shard_suffix = f"_shard{shard['index']}of{shard['count']}" if shard else ''
+        self.failed_csv_path = f'failed_leads_{datetime.now().strftime("%Y%m%d_%H%M%S")}{shard_suffix}.csv'
         self.failed_file = None
         self.failed_writer = None
         self._init_failed_csv()
         
         # Pre-load existing leadIds for faster duplicate checking
-        self.existing_lead_ids = set()
-        self.existing_phones = set()
-        if not dry_run:
+        self.existing_lead_ids = HashIndex()
+        self.existing_phones = HashIndex()
+        # Phones shared by several staging leads, and the phone|leadId keys of
+        # the lead each one is kept on (sharded runs only, see build_phone_owners)
+        self.contested_phones = None
+        self.phone_owners = None
+        if indexes is not None:
+            self.existing_lead_ids = indexes['lead_ids']
+            self.existing_phones = indexes['phones']
+            self.contested_phones = indexes['contested_phones']
+            self.phone_owners = indexes['phone_owners']
+        elif not dry_run:
             self._preload_existing_data()
         
         # Validate configuration
@@ -135,14 +400,16 @@ class LeadMigration:
                 logger.error(f"Failed to load checkpoint: {e}")
                 logger.info("Starting fresh migration")
     
-    def _save_checkpoint(self):
-        """Save current progress to checkpoint file"""
+    def _save_checkpoint(self, complete: bool = False):
+        """Save current progress to checkpoint file; complete marks a finished shard"""
         try:
-            checkpoint = {
-                'last_lead_id': self.last_lead_id,
-                'stats': self.stats,
-                'timestamp': datetime.now().isoformat()
-            }
+            with self._lock:
+                checkpoint = {
+                    'last_lead_id': self.last_lead_id,
+                    'stats': dict(self.stats),
+                    'timestamp': datetime.now().isoformat(),
+                    'complete': complete
+                }
             with open(self.checkpoint_file, 'w') as f:
                 json.dump(checkpoint, f, indent=2)
             logger.debug(f"Checkpoint saved: leadId={self.last_lead_id}")
@@ -152,37 +419,23 @@ class LeadMigration:
     def _preload_existing_data(self):
         """
         Pre-load all existing leadIds and mobilePhones from destination into memory
-        This is much faster than querying for each batch
+        This is much faster than querying for each batch. Rows are streamed with
+        an unbuffered cursor into HashIndex, so memory stays at ~8 bytes per key
         """
         logger.info("[INIT] Pre-loading existing data from destination...")
         try:
             dest_conn = self.connect_destination()
-            with dest_conn.cursor() as cursor:
-                # Load leadIds
-                cursor.execute(f"SELECT leadId FROM {self.destination_table}")
-                
-                count = 0
-                for row in cursor:
-                    self.existing_lead_ids.add(row['leadId'])
-                    count += 1
-                    if count % 100000 == 0:
-                        logger.info(f"  Loaded {count:,} existing leadIds...")
-                
-                logger.info(f"[OK] Loaded {len(self.existing_lead_ids):,} existing leadIds into memory")
-                
-                # Load mobilePhones (for duplicate checking)
-                cursor.execute(f"SELECT DISTINCT mobilePhone FROM {self.destination_table} WHERE mobilePhone IS NOT NULL")
-                
-                phone_count = 0
-                for row in cursor:
-                    self.existing_phones.add(row['mobilePhone'])
-                    phone_count += 1
-                    if phone_count % 100000 == 0:
-                        logger.info(f"  Loaded {phone_count:,} existing phone numbers...")
-                
-                logger.info(f"[OK] Loaded {len(self.existing_phones):,} existing phone numbers into memory")
+            try:
+                self.existing_lead_ids = HashIndex.from_query(
+                    dest_conn, f"SELECT leadId FROM {self.destination_table}", "leadIds")
                 
-            dest_conn.close()
+                # Load mobilePhones (for duplicate checking); HashIndex drops repeats
+                self.existing_phones = HashIndex.from_query(
+                    dest_conn,
+                    f"SELECT mobilePhone FROM {self.destination_table} WHERE mobilePhone IS NOT NULL",
+                    "phone numbers")
+            finally:
+                dest_conn.close()
         except Exception as e:
             logger.error(f"Failed to preload existing data: {e}")
             raise
@@ -199,15 +452,16 @@ class LeadMigration:
     def _log_failed_record(self, lead: Dict, reason: str):
         """Log a failed record to CSV"""
         if self.failed_writer and self.failed_file:
-            if self.failed_writer.fieldnames is None:
-                all_fields = list(lead.keys()) + ['failure_reason']
-                self.failed_writer.fieldnames = all_fields
-                self.failed_writer.writeheader()
-            
-            lead_copy = lead.copy()
-            lead_copy['failure_reason'] = reason
-            self.failed_writer.writerow(lead_copy)
-            self.failed_file.flush()
+            with self._lock:
+                if self.failed_writer.fieldnames is None:
+                    all_fields = list(lead.keys()) + ['failure_reason']
+                    self.failed_writer.fieldnames = all_fields
+                    self.failed_writer.writeheader()
+                
+                lead_copy = lead.copy()
+                lead_copy['failure_reason'] = reason
+                self.failed_writer.writerow(lead_copy)
+                self.failed_file.flush()
     
     def _validate_config(self):
         """Validate that all required config values are present"""
@@ -282,33 +536,42 @@ class LeadMigration:
         config['read_timeout'] = 600
         config['write_timeout'] = 600
         config['autocommit'] = False
+        # Session-wide, so it is set once per connection rather than around every batch
+        if self.disable_fk_checks:
+            config['init_command'] = "SET SESSION FOREIGN_KEY_CHECKS=0"
+        if isinstance(self.writer, LoadDataWriter):
+            config['local_infile'] = True
         return pymysql.connect(**config)
     
-    def fetch_pending_leads(self, conn: pymysql.Connection, fetch_limit: Optional[int] = None) -> List[Dict]:
+    def fetch_pending_leads(self, conn: pymysql.Connection, fetch_limit: Optional[int] = None,
+                            after_lead_id: Optional[str] = None) -> List[Dict]:
         """
         Fetch leads using cursor-based pagination (much faster than OFFSET)
-        Uses WHERE leadId > last_lead_id instead of OFFSET
+        Uses WHERE leadId > after_lead_id (default: last_lead_id) instead of OFFSET
         """
         limit_val = fetch_limit or self.batch_size
+        if after_lead_id is None:
+            after_lead_id = self.last_lead_id
+        
+        conditions = []
+        params = []
+        if after_lead_id is not None:
+            # Subsequent batches - use cursor-based pagination
+            conditions.append("leadId > %s")
+            params.append(after_lead_id)
+        if self.upper_lead_id is not None:
+            conditions.append("leadId <= %s")
+            params.append(self.upper_lead_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         
         with conn.cursor() as cursor:
-            if self.last_lead_id is None:
-                # First batch
-                query = f"""
-                    SELECT * FROM {self.staging_table} 
-                    ORDER BY leadId
-                    LIMIT %s
-                """
-                cursor.execute(query, (limit_val,))
-            else:
-                # Subsequent batches - use cursor-based pagination
-                query = f"""
-                    SELECT * FROM {self.staging_table} 
-                    WHERE leadId > %s
-                    ORDER BY leadId
-                    LIMIT %s
-                """
-                cursor.execute(query, (self.last_lead_id, limit_val))
+            query = f"""
+                SELECT * FROM {self.staging_table} 
+                {where}
+                ORDER BY leadId
+                LIMIT %s
+            """
+            cursor.execute(query, (*params, limit_val))
             
             return cursor.fetchall()
     
@@ -338,35 +601,27 @@ class LeadMigration:
     
     def check_duplicates_batch_fast(self, leads: List[Dict]) -> Tuple[Set[str], Dict[str, str]]:
         """
-        Fast duplicate checking using pre-loaded in-memory set
+        Fast duplicate checking using the pre-loaded in-memory HashIndex
         Returns: (duplicate_lead_ids, phone_duplicate_reasons)
         """
         if not leads:
             return set(), {}
         
-        duplicate_lead_ids = set()
-        phone_duplicate_reasons = {}
-        
         # Check leadId duplicates
-        for lead in leads:
-            lead_id = lead['leadId']
-            if lead_id in self.existing_lead_ids:
-                duplicate_lead_ids.add(lead_id)
+        lead_ids = [lead['leadId'] for lead in leads]
+        duplicate_lead_ids = {
+            lead_id for lead_id, found in zip(lead_ids, self.existing_lead_ids.contains_many(lead_ids)) if found
+        }
         
         # Check mobilePhone duplicates against destination
-        # Extract unique phones from this batch
-        phones_in_batch = set()
-        for lead in leads:
-            phone = lead.get('mobilePhone')
-            if phone:
-                phones_in_batch.add(phone)
-        
-        if phones_in_batch and hasattr(self, 'existing_phones'):
-            for lead in leads:
-                phone = lead.get('mobilePhone')
-                if phone and phone in self.existing_phones:
+        phone_duplicate_reasons = {}
+        phone_leads = [lead for lead in leads if lead.get('mobilePhone')]
+        if phone_leads:
+            found = self.existing_phones.contains_many([lead['mobilePhone'] for lead in phone_leads])
+            for lead, is_duplicate in zip(phone_leads, found):
+                if is_duplicate:
                     duplicate_lead_ids.add(lead['leadId'])
-                    phone_duplicate_reasons[lead['leadId']] = f"Duplicate mobilePhone: {phone}"
+                    phone_duplicate_reasons[lead['leadId']] = f"Duplicate mobilePhone: {lead['mobilePhone']}"
         
         return duplicate_lead_ids, phone_duplicate_reasons
     
@@ -398,34 +653,12 @@ class LeadMigration:
         prepared_leads = [self.prepare_lead_for_insert(lead) for lead in leads]
         
         columns = list(prepared_leads[0].keys())
-        column_str = ', '.join(columns)
-        placeholders = ', '.join(['%s'] * len(columns))
-        
-        values_list = []
-        for lead in prepared_leads:
-            values_list.append(tuple(lead[col] for col in columns))
-        
-        query = f"INSERT INTO {self.destination_table} ({column_str}) VALUES ({placeholders})"
+        values_list = [tuple(lead[col] for col in columns) for lead in prepared_leads]
         
         try:
-            with conn.cursor() as cursor:
-                if self.disable_fk_checks:
-                    cursor.execute("SET FOREIGN_KEY_CHECKS=0")
-                
-                rows_affected = cursor.executemany(query, values_list)
-                
-                if self.disable_fk_checks:
-                    cursor.execute("SET FOREIGN_KEY_CHECKS=1")
-                
-                return rows_affected if rows_affected else len(values_list)
+            return self.writer.write(conn, columns, values_list)
         except Exception as e:
             logger.error(f"Batch INSERT failed: {str(e)}")
-            if self.disable_fk_checks:
-                try:
-                    with conn.cursor() as cursor:
-                        cursor.execute("SET FOREIGN_KEY_CHECKS=1")
-                except:
-                    pass
             raise
     
     def process_batch(self, staging_conn: pymysql.Connection, 
@@ -438,6 +671,17 @@ class LeadMigration:
         # Update cursor position
         self.last_lead_id = leads[-1]['leadId']
         
+        insertable_leads = self.filter_batch(leads)
+        if insertable_leads:
+            self.write_batch(dest_conn, insertable_leads)
+    
+    def filter_batch(self, leads: List[Dict]) -> List[Dict]:
+        """
+        Drop duplicate, invalid and already-migrated leads from a fetched batch
+        and return the insertable ones. Runs on one thread at a time: the
+        returned leads' leadIds and phones are claimed in the in-memory indexes
+        """
+        
         # Step 1: Deduplicate within batch
         seen_lead_ids = set()
         unique_leads = []
@@ -471,7 +715,30 @@ class LeadMigration:
         
         if not valid_leads:
             logger.info("[INFO] No valid leads in this batch")
-            return
+            return []
+        
+        # Step 2.1: In sharded runs, a phone shared with other staging leads stays
+        # with the lead build_phone_owners picked, whichever shard that is in
+        if self.contested_phones is not None:
+            phone_leads = [lead for lead in valid_leads if lead.get('mobilePhone')]
+            contested = self.contested_phones.contains_many([lead['mobilePhone'] for lead in phone_leads])
+            contested_leads = [lead for lead, found in zip(phone_leads, contested) if found]
+            owned = self.phone_owners.contains_many(
+                [self.phone_owner_key(lead['mobilePhone'], lead['leadId']) for lead in contested_leads])
+            losing_ids = {lead['leadId'] for lead, is_owner in zip(contested_leads, owned) if not is_owner}
+            
+            if losing_ids:
+                for lead in valid_leads:
+                    if lead['leadId'] in losing_ids:
+                        self._log_failed_record(lead.copy(),
+                                                f"Duplicate mobilePhone kept on an earlier lead: {lead['mobilePhone']}")
+                self.stats['duplicates'] += len(losing_ids)
+                valid_leads = [lead for lead in valid_leads if lead['leadId'] not in losing_ids]
+                logger.info(f"[INFO] Removed {len(losing_ids)} leads whose phone is kept on an earlier lead")
+            
+            if not valid_leads:
+                logger.info("[INFO] No valid leads after cross-shard phone deduplication in this batch")
+                return []
 
         # Step 2.5: Deduplicate phones within batch (NEW: prevents insert failures on unique constraint)
         seen_phones = set()
@@ -497,7 +764,7 @@ class LeadMigration:
         
         if not valid_leads:
             logger.info("[INFO] No valid leads after phone deduplication in this batch")
-            return
+            return []
         
         # Step 3: Fast duplicate checking using in-memory set
         duplicate_lead_ids, phone_duplicate_reasons = self.check_duplicates_batch_fast(valid_leads)
@@ -516,22 +783,28 @@ class LeadMigration:
         
         if not insertable_leads:
             logger.info("[INFO] No insertable leads in this batch (all duplicates/invalid)")
-            return
+            return []
+        
+        # Claim the leadIds and phones now, so batches filtered while this one is
+        # being inserted treat them as taken. A failed insert stops the run, and
+        # the indexes are rebuilt from the destination on the next start
+        self.existing_lead_ids.add_many(lead['leadId'] for lead in insertable_leads)
+        self.existing_phones.add_many(
+            lead['mobilePhone'] for lead in insertable_leads if lead.get('mobilePhone'))
+        
+        return insertable_leads
+    
+    def write_batch(self, dest_conn: pymysql.Connection, insertable_leads: List[Dict]):
+        """Insert and commit filtered leads; safe to call from several threads with separate connections"""
         
         # Step 4: Batch insert
         if not self.dry_run:
             try:
-                rows_inserted = self.insert_leads_batch(dest_conn, insertable_leads)
-                dest_conn.commit()
-                
-                # Add newly inserted leadIds and phones to our in-memory sets
-                for lead in insertable_leads:
-                    self.existing_lead_ids.add(lead['leadId'])
-                    phone = lead.get('mobilePhone')
-                    if phone:
-                        self.existing_phones.add(phone)
+                rows_inserted = self.batch_sizer.commit_in_chunks(
+                    dest_conn, insertable_leads, self.insert_leads_batch)
                 
-                self.stats['successful'] += len(insertable_leads)
+                with self._lock:
+                    self.stats['successful'] += len(insertable_leads)
                 logger.info(f"[OK] Successfully inserted {rows_inserted} leads in batch")
                 
             except Exception as e:
@@ -543,91 +816,252 @@ class LeadMigration:
                 except:
                     logger.warning("Could not rollback - connection may be lost")
                 
-                for lead in insertable_leads:
+                # Chunks committed before the error stay inserted
+                committed = committed_rows(e)
+                if committed:
+                    logger.info(f"[OK] {committed} leads were committed before the error")
+                failed_leads = insertable_leads[committed:]
+                for lead in failed_leads:
                     self._log_failed_record(lead.copy(), f"Batch insert error: {error_msg}")
                 
-                self.stats['failed'] += len(insertable_leads)
+                with self._lock:
+                    self.stats['successful'] += committed
+                    self.stats['failed'] += len(failed_leads)
                 raise
         else:
             logger.info(f"[DRY RUN] Would insert {len(insertable_leads)} leads")
-            self.stats['successful'] += len(insertable_leads)
+            with self._lock:
+                self.stats['successful'] += len(insertable_leads)
     
-    def run(self):
-        """Execute the migration with optimizations"""
-        mode = "DRY RUN" if self.dry_run else "LIVE MIGRATION"
-        logger.info("="*80)
-        logger.info(f"Starting Lead Migration - {mode}")
-        logger.info(f"Batch Size: {self.batch_size}, Limit: {self.limit or 'No limit'}")
-        if self.resume:
-            logger.info(f"[RESUME] Continuing from leadId: {self.last_lead_id}")
-        if self.disable_fk_checks:
-            logger.info("[WARNING] Foreign key checks will be DISABLED during insert")
-        logger.info("="*80)
+    def _log_progress(self, total_processed: int, start_time: datetime):
+        """Log running totals, overall rate and ETA"""
+        elapsed = (datetime.now() - start_time).total_seconds()
+        overall_rate = total_processed / elapsed if elapsed > 0 else 0
         
-        staging_conn = None
-        dest_conn = None
+        logger.info(f"Progress: {total_processed} processed | "
+                  f"[OK] {self.stats['successful']} successful | "
+                  f"[FAIL] {self.stats['failed']} failed | "
+                  f"[SKIP] {self.stats['skipped'] + self.stats['duplicates']} skipped")
+        logger.info(f"Overall rate: {overall_rate:.1f} records/sec")
         
-        try:
-            staging_conn = self.connect_staging()
-            dest_conn = self.connect_destination()
+        # Estimate remaining time
+        if self.limit and overall_rate > 0:
+            remaining = self.limit - total_processed
+            eta_seconds = remaining / overall_rate
+            eta_mins = eta_seconds / 60
+            logger.info(f"ETA: {eta_mins:.1f} minutes")
+    
+    def _run_serial(self, staging_conn: pymysql.Connection, dest_conn: pymysql.Connection,
+                    start_time: datetime):
+        """Fetch, filter and insert one batch at a time"""
+        total_processed = 0
+        batch_num = 1
+        
+        while True:
+            # Check limit
+            if self.limit and total_processed >= self.limit:
+                logger.info(f"Reached limit of {self.limit} records")
+                break
             
-            logger.info("[OK] Database connections established")
+            # Adjust batch size for limit
+            fetch_size = self.batch_sizer.size
+            if self.limit:
+                fetch_size = min(fetch_size, self.limit - total_processed)
             
-            total_processed = 0
-            batch_num = 1
-            start_time = datetime.now()
+            # Fetch batch using cursor-based pagination
+            batch_start = datetime.now()
+            leads = self.fetch_pending_leads(staging_conn, fetch_size)
             
-            while True:
-                # Check limit
-                if self.limit and total_processed >= self.limit:
+            if not leads:
+                logger.info("No more pending leads to process")
+                break
+            
+            self.stats['total_fetched'] += len(leads)
+            logger.info(f"\n--- Batch {batch_num}: {len(leads)} leads (last_id: {self.last_lead_id or 'start'}) ---")
+            
+            # Process batch
+            self.process_batch(staging_conn, dest_conn, leads)
+            
+            # Save checkpoint every batch (only reaches here on success)
+            self._save_checkpoint()
+            
+            batch_duration = (datetime.now() - batch_start).total_seconds()
+            records_per_sec = len(leads) / batch_duration if batch_duration > 0 else 0
+            
+            total_processed += len(leads)
+            batch_num += 1
+            
+            logger.info(f"Batch completed in {batch_duration:.2f}s ({records_per_sec:.1f} records/sec)")
+            self._log_progress(total_processed, start_time)
+    
+    @staticmethod
+    def _put_page(pages: queue.Queue, item, stop: threading.Event):
+        """Block until `item` is queued, giving up once `stop` is set"""
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+    
+    def _read_pages(self, pages: queue.Queue, stop: threading.Event):
+        """
+        Reader thread for the pipelined mode: queue keyset pages after
+        last_lead_id, then None once staging is exhausted or the limit is
+        reached, or the exception that stopped it
+        """
+        staging_conn = None
+        end = None
+        try:
+            staging_conn = self.connect_staging()
+            after_lead_id = self.last_lead_id
+            fetched = 0
+            
+            while not stop.is_set():
+                if self.limit and fetched >= self.limit:
                     logger.info(f"Reached limit of {self.limit} records")
                     break
                 
-                # Adjust batch size for limit
-                fetch_size = self.batch_size
+                fetch_size = self.batch_sizer.size
                 if self.limit:
-                    fetch_size = min(self.batch_size, self.limit - total_processed)
-                
-                # Fetch batch using cursor-based pagination
-                batch_start = datetime.now()
-                leads = self.fetch_pending_leads(staging_conn, fetch_size)
+                    fetch_size = min(fetch_size, self.limit - fetched)
                 
+                leads = self.fetch_pending_leads(staging_conn, fetch_size, after_lead_id)
                 if not leads:
                     logger.info("No more pending leads to process")
                     break
                 
-                self.stats['total_fetched'] += len(leads)
-                logger.info(f"\n--- Batch {batch_num}: {len(leads)} leads (last_id: {self.last_lead_id or 'start'}) ---")
-                
-                # Process batch
-                self.process_batch(staging_conn, dest_conn, leads)
-                
-                # Save checkpoint every batch (only reaches here on success)
+                after_lead_id = leads[-1]['leadId']
+                fetched += len(leads)
+                self._put_page(pages, leads, stop)
+        except Exception as e:
+            end = e
+        finally:
+            if staging_conn:
+                staging_conn.close()
+        self._put_page(pages, end, stop)
+    
+    def _run_pipelined(self, start_time: datetime):
+        """
+        Overlap reading, filtering and inserting:
+        - a reader thread prefetches up to prefetch_batches keyset pages
+        - this thread filters each page against the in-memory indexes, in
+          leadId order, so a leadId or phone is only ever claimed once
+        - `workers` writer threads insert and commit the filtered batches,
+          each over its own destination connection
+        
+        Batches can commit out of order; last_lead_id and the checkpoint only
+        advance past a batch once it and every batch before it have committed.
+        Batches committed beyond a failed one are re-read on resume and skipped
+        as existing leadIds.
+        """
+        pages = queue.Queue(maxsize=self.prefetch_batches)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read_pages, args=(pages, stop),
+                                  name='lead-reader', daemon=True)
+        
+        local = threading.local()
+        connections = []
+        
+        def write(insertable_leads: List[Dict]):
+            if insertable_leads:
+                conn = getattr(local, 'conn', None)
+                if conn is None and not self.dry_run:
+                    conn = local.conn = self.connect_destination()
+                    with self._lock:
+                        connections.append(conn)
+                self.write_batch(conn, insertable_leads)
+        
+        in_flight = {}      # future -> batch number
+        batches = {}        # batch number -> (last leadId, size) until checkpointed
+        committed = set()
+        progress = {'next_batch': 1, 'processed': 0}
+        
+        def collect():
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                future.result()  # re-raises the writer's error
+                committed.add(batch)
+            
+            advanced = False
+            while progress['next_batch'] in committed:
+                committed.remove(progress['next_batch'])
+                last_lead_id, size = batches.pop(progress['next_batch'])
+                self.last_lead_id = last_lead_id
+                progress['processed'] += size
+                progress['next_batch'] += 1
+                advanced = True
+            if advanced:
                 self._save_checkpoint()
+                self._log_progress(progress['processed'], start_time)
+        
+        logger.info(f"[PIPELINE] {self.workers} writer(s), prefetching up to {self.prefetch_batches} batches")
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='lead-writer')
+        reader.start()
+        try:
+            batch_num = 0
+            page_after = self.last_lead_id
+            while True:
+                item = pages.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
                 
-                batch_duration = (datetime.now() - batch_start).total_seconds()
-                records_per_sec = len(leads) / batch_duration if batch_duration > 0 else 0
-                
-                total_processed += len(leads)
+                leads = item
                 batch_num += 1
+                self.stats['total_fetched'] += len(leads)
+                logger.info(f"\n--- Batch {batch_num}: {len(leads)} leads (last_id: {page_after or 'start'}) ---")
+                batches[batch_num] = (leads[-1]['leadId'], len(leads))
+                page_after = leads[-1]['leadId']
                 
-                # Log progress
-                elapsed = (datetime.now() - start_time).total_seconds()
-                overall_rate = total_processed / elapsed if elapsed > 0 else 0
+                in_flight[executor.submit(write, self.filter_batch(leads))] = batch_num
+                
+                # At most one batch queued per writer behind the ones being inserted
+                while len(in_flight) >= 2 * self.workers:
+                    collect()
+            
+            while in_flight:
+                collect()
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            for conn in connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            reader.join(timeout=5)
+    
+    def run(self):
+        """Execute the migration with optimizations"""
+        mode = "DRY RUN" if self.dry_run else "LIVE MIGRATION"
+        logger.info("="*80)
+        logger.info(f"Starting Lead Migration - {mode}")
+        logger.info(f"Batch Size: {self.batch_size}{' (adaptive)' if self.batch_sizer.adaptive else ''}, "
+                    f"Limit: {self.limit or 'No limit'}, Writer: {self.writer.name}")
+        if self.resume:
+            logger.info(f"[RESUME] Continuing from leadId: {self.last_lead_id}")
+        if self.disable_fk_checks:
+            logger.info("[WARNING] Foreign key checks will be DISABLED during insert")
+        logger.info("="*80)
+        
+        staging_conn = None
+        dest_conn = None
+        
+        try:
+            start_time = datetime.now()
+            
+            if self.pipeline:
+                self._run_pipelined(start_time)
+            else:
+                staging_conn = self.connect_staging()
+                dest_conn = self.connect_destination()
                 
-                logger.info(f"Batch completed in {batch_duration:.2f}s ({records_per_sec:.1f} records/sec)")
-                logger.info(f"Progress: {total_processed} processed | "
-                          f"[OK] {self.stats['successful']} successful | "
-                          f"[FAIL] {self.stats['failed']} failed | "
-                          f"[SKIP] {self.stats['skipped'] + self.stats['duplicates']} skipped")
-                logger.info(f"Overall rate: {overall_rate:.1f} records/sec")
+                logger.info("[OK] Database connections established")
                 
-                # Estimate remaining time
-                if self.limit and overall_rate > 0:
-                    remaining = self.limit - total_processed
-                    eta_seconds = remaining / overall_rate
-                    eta_mins = eta_seconds / 60
-                    logger.info(f"ETA: {eta_mins:.1f} minutes")
+                self._run_serial(staging_conn, dest_conn, start_time)
             
             # Final summary
             total_duration = (datetime.now() - start_time).total_seconds()
@@ -648,8 +1082,12 @@ class LeadMigration:
                 logger.warning(f"\n[WARNING] {self.stats['failed']} records failed.")
                 logger.warning(f"  Failed records exported to: {self.failed_csv_path}")
             
-            # Clean up checkpoint on success
-            if Path(self.checkpoint_file).exists():
+            # Clean up checkpoint on success; a shard's is kept, marked complete,
+            # until run_sharded has seen every shard finish
+            if self.shard:
+                self._save_checkpoint(complete=True)
+                logger.info("Shard checkpoint marked complete")
+            elif Path(self.checkpoint_file).exists():
                 Path(self.checkpoint_file).unlink()
                 logger.info("Checkpoint file removed (migration complete)")
             
@@ -672,6 +1110,180 @@ class LeadMigration:
                 self.failed_file.close()
             logger.info("\nDatabase connections closed")
 
+    @staticmethod
+    def phone_owner_key(phone: str, lead_id: str) -> str:
+        return f"{phone}\t{lead_id}"
+    
+    def plan_shards(self, shards: int) -> List[Dict]:
+        """
+        Split the staging table's leadIds into `shards` ranges of about equal
+        row counts. Each range is leadId > lower and <= upper (None: unbounded)
+        """
+        conn = self.connect_staging()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) AS total FROM {self.staging_table}")
+                total = cursor.fetchone()['total']
+                
+                # Quantile boundaries; repeated leadIds can collapse two of them into one
+                bounds = []
+                for i in range(1, shards):
+                    offset = total * i // shards - 1
+                    if offset < 0:
+                        continue
+                    cursor.execute(
+                        f"SELECT leadId FROM {self.staging_table} ORDER BY leadId LIMIT 1 OFFSET %s", (offset,))
+                    row = cursor.fetchone()
+                    if row and (not bounds or row['leadId'] != bounds[-1]):
+                        bounds.append(row['leadId'])
+        finally:
+            conn.close()
+        
+        edges = [None] + bounds + [None]
+        return [{'index': i + 1, 'count': len(edges) - 1, 'lower': edges[i], 'upper': edges[i + 1]}
+                for i in range(len(edges) - 1)]
+    
+    def build_phone_owners(self) -> Tuple[HashIndex, HashIndex]:
+        """
+        Decide which lead keeps each phone number shared by several staging
+        leads, before any shard starts: the first lead in leadId order that is
+        valid and not already in the destination, as a serial run would pick.
+        Only rows with a shared phone are read (streamed).
+        Returns (contested phones, phone_owner_key of each owner)
+        """
+        logger.info("[SHARDS] Resolving phone numbers shared by several staging leads...")
+        query = f"""
+            SELECT s.* FROM {self.staging_table} s
+            JOIN (
+                SELECT mobilePhone FROM {self.staging_table}
+                WHERE mobilePhone IS NOT NULL
+                GROUP BY mobilePhone
+                HAVING COUNT(*) > 1
+            ) shared ON s.mobilePhone = shared.mobilePhone
+            ORDER BY s.leadId
+        """
+        contested = set()
+        owners = {}
+        conn = self.connect_staging()
+        try:
+            with conn.cursor(SSDictCursor) as cursor:
+                cursor.execute(query)
+                for lead in cursor:
+                    phone = lead['mobilePhone']
+                    contested.add(phone)
+                    if phone in owners or lead['leadId'] in self.existing_lead_ids:
+                        continue
+                    if self.validate_lead_data(lead)[0]:
+                        owners[phone] = lead['leadId']
+        finally:
+            conn.close()
+        
+        logger.info(f"[OK] {len(contested):,} shared phone numbers, {len(owners):,} kept on a staging lead")
+        return (HashIndex(HashIndex.hash_keys(contested)),
+                HashIndex(HashIndex.hash_keys(self.phone_owner_key(phone, lead_id)
+                                              for phone, lead_id in owners.items())))
+    
+    def shard_checkpoint_file(self, shard: Dict) -> str:
+        path = Path(self.checkpoint_file)
+        return str(path.with_name(f"{path.stem}.shard{shard['index']}of{shard['count']}{path.suffix}"))
+    
+    def shard_complete(self, shard: Dict) -> bool:
+        """True if the shard's checkpoint says it finished in an earlier run"""
+        path = Path(self.shard_checkpoint_file(shard))
+        if not path.exists():
+            return False
+        try:
+            with open(path, 'r') as f:
+                return bool(json.load(f).get('complete'))
+        except Exception as e:
+            logger.warning(f"Could not read {path}: {e}")
+            return False
+    
+    def run_sharded(self, shards: int, migration_kwargs: Dict):
+        """
+        Migrate the leadId range as `shards` processes, one per range from
+        plan_shards, each with its own checkpoint file and connections
+        (1 staging + `workers` destination connections with --pipeline).
+        
+        The destination indexes and phone owners are built once here and handed
+        to every shard, so a phone shared across shards is inserted only once.
+        The plan is saved next to the checkpoint so --resume reuses the same
+        ranges even if staging has changed since. A finished shard leaves its
+        checkpoint marked complete, so --resume only restarts unfinished
+        shards; the plan and checkpoints are removed once every shard is done.
+        """
+        plan_file = Path(self.checkpoint_file).with_suffix('.shards.json')
+        plan = None
+        if self.resume and plan_file.exists():
+            with open(plan_file, 'r') as f:
+                plan = json.load(f)
+            logger.info(f"[RESUME] Reusing the {len(plan)}-shard plan in {plan_file}")
+            if len(plan) != shards:
+                logger.warning(f"[WARNING] --shards {shards} ignored, resuming with {len(plan)} shards")
+        if plan is None:
+            plan = self.plan_shards(shards)
+            with open(plan_file, 'w') as f:
+                json.dump(plan, f, indent=2)
+        
+        pending = []
+        for shard in plan:
+            if self.resume and self.shard_complete(shard):
+                logger.info(f"[SHARD {shard['index']}/{shard['count']}] Already complete, skipping")
+                continue
+            logger.info(f"[SHARD {shard['index']}/{shard['count']}] leadId > {shard['lower'] or 'start'} "
+                        f"and <= {shard['upper'] or 'end'}")
+            pending.append(shard)
+        
+        contested_phones, phone_owners = self.build_phone_owners()
+        indexes = {
+            'lead_ids': self.existing_lead_ids,
+            'phones': self.existing_phones,
+            'contested_phones': contested_phones,
+            'phone_owners': phone_owners,
+        }
+        
+        processes = []
+        for shard in pending:
+            shard_kwargs = dict(migration_kwargs, checkpoint_file=self.shard_checkpoint_file(shard))
+            process = multiprocessing.Process(target=_run_shard, args=(shard_kwargs, shard, indexes),
+                                              name=f"lead-shard-{shard['index']}")
+            process.start()
+            processes.append(process)
+        
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # The shards get the same SIGINT and save their checkpoints
+            logger.warning("\n[INTERRUPTED] Waiting for shards to save their checkpoints")
+            for process in processes:
+                process.join()
+        finally:
+            if self.failed_file:
+                self.failed_file.close()
+            # The coordinator inserts nothing; failed records are in the shards' CSVs
+            if Path(self.failed_csv_path).exists() and Path(self.failed_csv_path).stat().st_size == 0:
+                Path(self.failed_csv_path).unlink()
+        
+        failed = [shard for shard, process in zip(pending, processes) if process.exitcode != 0]
+        if failed:
+            for shard in failed:
+                logger.error(f"[SHARD {shard['index']}/{shard['count']}] did not complete, "
+                             f"checkpoint: {self.shard_checkpoint_file(shard)}")
+            logger.info(f"Resume with --resume --shards {len(plan)}")
+            sys.exit(1)
+        
+        for shard in plan:
+            Path(self.shard_checkpoint_file(shard)).unlink(missing_ok=True)
+        plan_file.unlink()
+        logger.info(f"[OK] All {len(plan)} shards complete")
+
+
+def _run_shard(migration_kwargs: Dict, shard: Dict, indexes: Dict[str, HashIndex]):
+    """Process entry point for one leadId range of a sharded migration"""
+    logger.info(f"[SHARD {shard['index']}/{shard['count']}] Starting")
+    migration = LeadMigration(**migration_kwargs, shard=shard, indexes=indexes)
+    migration.run()
 
 def main():
     parser = argparse.ArgumentParser(
@@ -690,13 +1302,31 @@ Examples:
 
   # Large migration with progress tracking
   python %(prog)s --batch-size 5000 --limit 100000
+
+  # Overlap staging reads with 4 concurrent writers
+  python %(prog)s --batch-size 5000 --pipeline --workers 4
+
+  # Full re-migration on 8 processes, each with 2 writer connections
+  python %(prog)s --batch-size 5000 --shards 8 --pipeline --workers 2
+
+  # Let the batch size follow destination load, aiming for 2s commits
+  python %(prog)s --adaptive-batch-size --target-commit-seconds 2
+
+  # Bulk-load the whole staging table with LOAD DATA (server needs local_infile=ON)
+  python %(prog)s --batch-size 20000 --writer load-data --disable-fk-checks
         """
     )
     
     parser.add_argument('--dry-run', action='store_true', 
                        help='Run without writing to destination (test mode)')
     parser.add_argument('--batch-size', type=int, default=2000, 
-                       help='Number of records per batch (default: 2000, recommended: 2000-5000)')
+                       help='Number of records per batch (default: 2000); the starting size with --adaptive-batch-size')
+    parser.add_argument('--adaptive-batch-size', action='store_true',
+                       help='Grow or shrink batches to commit in about --target-commit-seconds')
+    parser.add_argument('--target-commit-seconds', type=float, default=2.0,
+                       help='Commit latency the adaptive batch size aims for (default: 2.0)')
+    parser.add_argument('--max-batch-size', type=int, default=50000,
+                       help='Largest adaptive batch size (default: 50000)')
     parser.add_argument('--limit', type=int, 
                        help='Maximum number of records to migrate (default: all)')
     parser.add_argument('--resume', action='store_true',
@@ -711,6 +1341,18 @@ Examples:
                        help='Enable DEBUG logging')
     parser.add_argument('--disable-fk-checks', action='store_true',
                        help='Disable foreign key checks during insert')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Prefetch batches on a reader thread and insert them on writer threads')
+    parser.add_argument('--workers', type=int, default=2,
+                       help='Writer threads (and destination connections) with --pipeline (default: 2)')
+    parser.add_argument('--prefetch-batches', type=int, default=4,
+                       help='Batches the --pipeline reader may fetch ahead (default: 4)')
+    parser.add_argument('--shards', type=int, default=1,
+                       help='Split the leadId range across this many processes, each with its own '
+                            'checkpoint file (default: 1)')
+    parser.add_argument('--writer', choices=list(WRITERS), default=MultiRowInsertWriter.name,
+                       help='Insert strategy: multirow INSERTs sized to max_allowed_packet (default), '
+                            'executemany, or load-data (LOAD DATA LOCAL INFILE)')
     
     args = parser.parse_args()
     
@@ -731,8 +1373,11 @@ Examples:
         logger.error("ERROR: Database host not configured in .env file")
         sys.exit(1)
     
+    if args.shards > 1 and args.limit:
+        parser.error("--limit cannot be combined with --shards")
+    
     # Run migration
-    migration = LeadMigration(
+    migration_kwargs = dict(
         staging_config=staging_config,
         destination_config=destination_config,
         dry_run=args.dry_run,
@@ -740,10 +1385,21 @@ Examples:
         limit=args.limit,
         disable_fk_checks=args.disable_fk_checks,
         checkpoint_file=args.checkpoint_file,
-        resume=args.resume
+        resume=args.resume,
+        writer=args.writer,
+        pipeline=args.pipeline,
+        workers=args.workers,
+        prefetch_batches=args.prefetch_batches,
+        adaptive_batch_size=args.adaptive_batch_size,
+        target_commit_seconds=args.target_commit_seconds,
+        max_batch_size=args.max_batch_size
     )
+    migration = LeadMigration(**migration_kwargs)
     
-    migration.run()
+    if args.shards > 1:
+        migration.run_sharded(args.shards, migration_kwargs)
+    else:
+        migration.run()
 
 
 if __name__ == '__main__':
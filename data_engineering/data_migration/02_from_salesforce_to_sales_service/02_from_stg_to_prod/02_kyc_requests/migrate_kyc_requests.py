@@ -4,6 +4,7 @@ KYC Requests Migration Script - PERFORMANCE OPTIMIZED
 Adapted from Lead Migration: Cursor pagination, batch inserts, pre-loaded dups, checkpointing.
 Optimized for ~31k records: Fast batches, minimal roundtrips.
 Now with FK pre-validation: Checks leadId exists in 'leads' table, logs missing ones to CSV.
+Optional adaptive batch size (--adaptive-batch-size): see batch_sizing.py
 """
 
 import argparse
@@ -19,6 +20,10 @@ from dotenv import load_dotenv
 import json
 from pathlib import Path
 
+# batch_sizing.py is shared by the migrations in 02_from_stg_to_prod
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from batch_sizing import AdaptiveBatchSize, committed_rows  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
@@ -65,7 +70,9 @@ MYSQL_CONFIGS = {
 class KycMigration:
     def __init__(self, staging_config: Dict, destination_config: Dict, leads_config: Dict, dry_run: bool = False, 
                  batch_size: int = 5000, limit: Optional[int] = None, disable_fk_checks: bool = False,
-                 checkpoint_file: str = "kyc_migration_checkpoint.json", resume: bool = False):
+                 checkpoint_file: str = "kyc_migration_checkpoint.json", resume: bool = False,
+                 adaptive_batch_size: bool = False, target_commit_seconds: float = 2.0,
+                 max_batch_size: int = 50000):
         """
         Initialize migration manager with performance optimizations
         
@@ -80,6 +87,10 @@ class KycMigration:
         self.leads_table = leads_config.get('table_name', 'leads')
         self.dry_run = dry_run
         self.batch_size = batch_size
+        # Sizes every fetch; backs off on lock waits and packet errors even when not adaptive
+        self.batch_sizer = AdaptiveBatchSize(batch_size, adaptive=adaptive_batch_size,
+                                             target_seconds=target_commit_seconds,
+                                             max_size=max_batch_size)
         self.limit = limit
         self.disable_fk_checks = disable_fk_checks
         self.checkpoint_file = checkpoint_file
@@ -547,8 +558,8 @@ class KycMigration:
         # Step 4: Batch insert
         if not self.dry_run:
             try:
-                rows_inserted = self.insert_records_batch(dest_conn, insertable_records)
-                dest_conn.commit()
+                rows_inserted = self.batch_sizer.commit_in_chunks(
+                    dest_conn, insertable_records, self.insert_records_batch)
                 self.stats['successful'] += len(insertable_records)
                 logger.info(f"[OK] Successfully inserted {rows_inserted} records in batch")
                 if self.stats['fk_failed'] > 0:
@@ -561,10 +572,16 @@ class KycMigration:
                 except:
                     logger.warning("Could not rollback - connection may be lost")
                 
-                for record in insertable_records:
+                # Chunks committed before the error stay inserted
+                committed = committed_rows(e)
+                if committed:
+                    logger.info(f"[OK] {committed} records were committed before the error")
+                    self.stats['successful'] += committed
+                failed_records = insertable_records[committed:]
+                for record in failed_records:
                     self._log_failed_record(record.copy(), f"Batch insert error: {error_msg}")
                 
-                self.stats['failed'] += len(insertable_records)
+                self.stats['failed'] += len(failed_records)
                 raise
         else:
             logger.info(f"[DRY RUN] Would insert {len(insertable_records)} records")
@@ -575,7 +592,8 @@ class KycMigration:
         mode = "DRY RUN" if self.dry_run else "LIVE MIGRATION"
         logger.info("="*80)
         logger.info(f"Starting KYC Migration - {mode}")
-        logger.info(f"Batch Size: {self.batch_size}, Limit: {self.limit or 'No limit'}")
+        logger.info(f"Batch Size: {self.batch_size}{' (adaptive)' if self.batch_sizer.adaptive else ''}, "
+                    f"Limit: {self.limit or 'No limit'}")
         if self.resume:
             logger.info(f"[RESUME] Continuing from externalRefId: {self.last_external_ref_id}")
         if self.disable_fk_checks:
@@ -602,9 +620,9 @@ class KycMigration:
                     break
                 
                 # Adjust batch size for limit
-                fetch_size = self.batch_size
+                fetch_size = self.batch_sizer.size
                 if self.limit:
-                    fetch_size = min(self.batch_size, self.limit - total_processed)
+                    fetch_size = min(fetch_size, self.limit - total_processed)
                 
                 # Fetch batch using cursor-based pagination
                 batch_start = datetime.now()
@@ -713,7 +731,13 @@ Examples:
     parser.add_argument('--dry-run', action='store_true', 
                        help='Run without writing to destination (test mode)')
     parser.add_argument('--batch-size', type=int, default=5000, 
-                       help='Number of records per batch (default: 5000, recommended: 5000-10000 for 31k total)')
+                       help='Number of records per batch (default: 5000); the starting size with --adaptive-batch-size')
+    parser.add_argument('--adaptive-batch-size', action='store_true',
+                       help='Grow or shrink batches to commit in about --target-commit-seconds')
+    parser.add_argument('--target-commit-seconds', type=float, default=2.0,
+                       help='Commit latency the adaptive batch size aims for (default: 2.0)')
+    parser.add_argument('--max-batch-size', type=int, default=50000,
+                       help='Largest adaptive batch size (default: 50000)')
     parser.add_argument('--limit', type=int, 
                        help='Maximum number of records to migrate (default: all)')
     parser.add_argument('--resume', action='store_true',
@@ -759,7 +783,10 @@ Examples:
         limit=args.limit,
         disable_fk_checks=args.disable_fk_checks,
         checkpoint_file=args.checkpoint_file,
-        resume=args.resume
+        resume=args.resume,
+        adaptive_batch_size=args.adaptive_batch_size,
+        target_commit_seconds=args.target_commit_seconds,
+        max_batch_size=args.max_batch_size
     )
     
     migration.run()
@@ -4,6 +4,7 @@ Next of Kin Details Migration Script - PERFORMANCE OPTIMIZED
 Adapted from KYC Migration: Cursor pagination on leadId, batch inserts, pre-loaded dups, checkpointing.
 Optimized for ~51k records: Fast batches, minimal roundtrips.
 With FK pre-validation: Checks leadId exists in 'leads' table, logs missing ones to CSV.
+Optional adaptive batch size (--adaptive-batch-size): see batch_sizing.py
 """
 import argparse
 import logging
@@ -17,6 +18,9 @@ import os
 from dotenv import load_dotenv
 import json
 from pathlib import Path
+# batch_sizing.py is shared by the migrations in 02_from_stg_to_prod
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from batch_sizing import AdaptiveBatchSize, committed_rows  # noqa: E402
 # Load environment variables
 load_dotenv()
 # Configure logging
@@ -60,7 +64,8 @@ class NextOfKinMigration:
     def __init__(self, staging_config: Dict, destination_config: Dict, leads_config: Dict,
                  dry_run: bool = False, batch_size: int = 5000, limit: Optional[int] = None,
                  disable_fk_checks: bool = False, checkpoint_file: str = "nok_migration_checkpoint.json",
-                 resume: bool = False):
+                 resume: bool = False, adaptive_batch_size: bool = False,
+                 target_commit_seconds: float = 2.0, max_batch_size: int = 50000):
         """
         Initialize migration manager with performance optimizations
         """
@@ -72,6 +77,10 @@ class NextOfKinMigration:
         self.leads_table = leads_config.get('table_name', 'leads')
         self.dry_run = dry_run
         self.batch_size = batch_size
+        # Sizes every fetch; backs off on lock waits and packet errors even when not adaptive
+        self.batch_sizer = AdaptiveBatchSize(batch_size, adaptive=adaptive_batch_size,
+                                             target_seconds=target_commit_seconds,
+                                             max_size=max_batch_size)
         self.limit = limit
         self.disable_fk_checks = disable_fk_checks
         self.checkpoint_file = checkpoint_file
@@ -277,6 +286,9 @@ class NextOfKinMigration:
         config['read_timeout'] = 600
         config['write_timeout'] = 600
         config['autocommit'] = False
+        # Session-wide, and re-applied when commit_in_chunks reconnects after a dropped connection
+        if self.disable_fk_checks:
+            config['init_command'] = "SET SESSION FOREIGN_KEY_CHECKS=0"
         return pymysql.connect(**config)
    
     def connect_leads(self) -> pymysql.Connection:
@@ -377,44 +389,50 @@ class NextOfKinMigration:
         return len(records)
 
     def _insert_batch(self, batch: List[Dict]):
-        """Perform batch insert into destination table"""
+        """Perform batch insert into destination table, committing in chunks sized by batch_sizer"""
         if not batch:
             return
 
         conn = self.connect_destination()
         try:
-            with conn.cursor() as cursor:
-                # Assume all records have same structure; use first for columns
-                columns = list(batch[0].keys())
-                col_str = ', '.join(columns)
-                placeholders = ', '.join(['%s'] * len(columns))
-                query = f"INSERT INTO {self.destination_table} ({col_str}) VALUES ({placeholders})"
-
-                values = [tuple(rec[col] for col in columns) for rec in batch]
-
-                if self.disable_fk_checks:
-                    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
-
-                cursor.executemany(query, values)
-                conn.commit()
-
-                if self.disable_fk_checks:
-                    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
-
+            self.batch_sizer.commit_in_chunks(conn, batch, self._insert_rows)
             logger.info(f"Batch insert successful: {len(batch)} rows")
         except Exception as e:
-            conn.rollback()
+            try:
+                conn.rollback()
+            except Exception:
+                pass
             logger.error(f"Batch insert failed: {e}")
-            for rec in batch:
+            # Chunks committed before the error stay inserted
+            committed = committed_rows(e)
+            if committed:
+                logger.info(f"[INSERTED] {committed} records committed before the error")
+                self.stats['successful'] += committed
+            for rec in batch[committed:]:
                 self._log_failed_record(rec, f"Insert error: {str(e)}")
                 self.stats['failed'] += 1
             raise
         finally:
             conn.close()
 
+    def _insert_rows(self, conn: pymysql.Connection, rows: List[Dict]) -> int:
+        """INSERT one chunk of prepared records without committing"""
+        with conn.cursor() as cursor:
+            # Assume all records have same structure; use first for columns
+            columns = list(rows[0].keys())
+            col_str = ', '.join(columns)
+            placeholders = ', '.join(['%s'] * len(columns))
+            query = f"INSERT INTO {self.destination_table} ({col_str}) VALUES ({placeholders})"
+
+            values = [tuple(rec[col] for col in columns) for rec in rows]
+
+            rows_affected = cursor.executemany(query, values)
+            return rows_affected if rows_affected else len(values)
+
     def run(self):
         """Main migration loop"""
-        logger.info(f"Starting Next of Kin Migration - Dry Run: {self.dry_run}, Limit: {self.limit}, Batch Size: {self.batch_size}")
+        logger.info(f"Starting Next of Kin Migration - Dry Run: {self.dry_run}, Limit: {self.limit}, "
+                    f"Batch Size: {self.batch_size}{' (adaptive)' if self.batch_sizer.adaptive else ''}")
         if self.resume:
             logger.info(f"Resuming from leadId: {self.last_lead_id}")
         staging_conn = None
@@ -422,12 +440,15 @@ class NextOfKinMigration:
         try:
             staging_conn = self.connect_staging()
             while True:
-                remaining_limit = self.limit - total_processed if self.limit else self.batch_size
-                if self.limit and remaining_limit <= 0:
-                    logger.info(f"Limit {self.limit} reached. Stopping.")
-                    break
+                fetch_size = self.batch_sizer.size
+                if self.limit:
+                    remaining_limit = self.limit - total_processed
+                    if remaining_limit <= 0:
+                        logger.info(f"Limit {self.limit} reached. Stopping.")
+                        break
+                    fetch_size = min(fetch_size, remaining_limit)
 
-                records = self.fetch_pending_records(staging_conn, remaining_limit)
+                records = self.fetch_pending_records(staging_conn, fetch_size)
                 if not records:
                     logger.info("No more records to fetch. Migration complete.")
                     break
@@ -461,7 +482,14 @@ def main():
     parser = argparse.ArgumentParser(description="Migrate Next of Kin Details to dev")
     parser.add_argument('--dry-run', action='store_true', help='Simulate without inserting')
     parser.add_argument('--limit', type=int, help='Max records to process')
-    parser.add_argument('--batch-size', type=int, default=5000, help='Records per batch')
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help='Records per batch; the starting size with --adaptive-batch-size')
+    parser.add_argument('--adaptive-batch-size', action='store_true',
+                        help='Grow or shrink batches to commit in about --target-commit-seconds')
+    parser.add_argument('--target-commit-seconds', type=float, default=2.0,
+                        help='Commit latency the adaptive batch size aims for (default: 2.0)')
+    parser.add_argument('--max-batch-size', type=int, default=50000,
+                        help='Largest adaptive batch size (default: 50000)')
     parser.add_argument('--disable-fk-checks', action='store_true', help='Disable FK checks during insert')
     parser.add_argument('--checkpoint', default='nok_migration_checkpoint.json', help='Checkpoint file path')
     parser.add_argument('--resume', action='store_true', help='Resume from last checkpoint')
@@ -480,7 +508,10 @@ def main():
         limit=args.limit,
         disable_fk_checks=args.disable_fk_checks,
         checkpoint_file=args.checkpoint,
-        resume=args.resume
+        resume=args.resume,
+        adaptive_batch_size=args.adaptive_batch_size,
+        target_commit_seconds=args.target_commit_seconds,
+        max_batch_size=args.max_batch_size
     )
 
     migration.run()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Adaptive batch sizing shared by the staging -> sales-service migrations
+(leads, kyc_requests, next_of_kin_details)
+
+AdaptiveBatchSize picks how many rows go into one INSERT + COMMIT:
+1. Latency target: after every commit the throughput (rows/sec, smoothed)
+   is turned into the size that would take target_seconds to commit. The
+   size moves towards it by at most x1.5 up or x0.5 down per commit, and
+   never grows after a commit slower than the target, so a busier
+   destination gets smaller batches and an idle one larger ones. A commit
+   more than twice the target is sized from its own rate, not the average.
+2. Back-off: a lock wait timeout, deadlock, oversized packet or dropped
+   connection during the INSERT rolls the chunk back, halves the size and
+   retries the rest of the batch in smaller chunks instead of failing the run.
+   A size that failed with a packet or connection error is not tried again.
+
+Every size change is logged with the commit that caused it.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# MySQL errors worth retrying with a smaller batch
+RETRYABLE_ERRORS = {
+    1205: 'lock wait timeout',
+    1213: 'deadlock',
+    1153: 'packet larger than max_allowed_packet',
+    2006: 'server has gone away',
+    2013: 'lost connection during query',
+}
+
+# Errors after which the connection is no longer usable
+CONNECTION_ERRORS = {1153, 2006, 2013}
+
+# Smoothing of the measured rows/sec (weight of the latest commit)
+RATE_SMOOTHING = 0.3
+
+# Largest step per commit, as a factor of the current size
+MAX_GROWTH = 1.5
+MAX_SHRINK = 0.5
+
+# Only log resizes of at least this fraction of the current size
+LOG_THRESHOLD = 0.1
+
+
+def committed_rows(error: Exception) -> int:
+    """Rows commit_in_chunks had committed before it raised `error`"""
+    return getattr(error, 'committed_rows', 0)
+
+
+def mysql_error_code(error: Exception) -> Optional[int]:
+    """MySQL error number of a PyMySQL error, if any"""
+    if isinstance(error, pymysql.err.MySQLError) and error.args and isinstance(error.args[0], int):
+        return error.args[0]
+    return None
+
+
+class AdaptiveBatchSize:
+    """
+    Batch size controller for one migration run
+
+    `size` is read before each fetch; commit_in_chunks inserts and commits a
+    fetched batch, feeding the commit latencies back. With adaptive=False the
+    size only changes when backing off from an error. Safe to share between
+    writer threads.
+    """
+
+    def __init__(self, initial: int, adaptive: bool = False, target_seconds: float = 2.0,
+                 min_size: int = 100, max_size: int = 50000, max_backoff_seconds: float = 30.0):
+        self.adaptive = adaptive
+        self.target_seconds = target_seconds
+        self.min_size = min(min_size, initial)
+        self.max_size = max(max_size, initial)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._size = initial
+        # Below the smallest size that failed with a packet/connection error
+        self._ceiling = self.max_size
+        self._rate = None
+        self._consecutive_errors = 0
+        self._lock = threading.Lock()
+
+        if adaptive:
+            logger.info(f"[BATCH] Adaptive batch size: starting at {initial}, "
+                        f"target commit {target_seconds:.1f}s, range {self.min_size}-{self.max_size}")
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _resize(self, new_size: int, reason: str):
+        new_size = max(self.min_size, min(self._ceiling, int(new_size)))
+        if new_size == self._size:
+            return
+        if abs(new_size - self._size) >= self._size * LOG_THRESHOLD:
+            logger.info(f"[BATCH] Batch size {self._size} -> {new_size} ({reason})")
+        self._size = new_size
+
+    def observe(self, rows: int, seconds: float):
+        """Record a successful commit of `rows` rows that took `seconds`"""
+        with self._lock:
+            self._consecutive_errors = 0
+            # A batch's small tail chunk is mostly fixed overhead; it says little about the rate
+            if not self.adaptive or rows < self._size * MAX_SHRINK or seconds <= 0:
+                return
+
+            rate = rows / seconds
+            if seconds > self.target_seconds / MAX_SHRINK:
+                # Far over target: load jumped, so size from this commit alone
+                # instead of an average still dominated by the faster past
+                self._rate = rate
+            else:
+                self._rate = rate if self._rate is None else (
+                    RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self._rate)
+
+            wanted = self._rate * self.target_seconds
+            wanted = max(self._size * MAX_SHRINK, min(self._size * MAX_GROWTH, wanted))
+            # The smoothed rate lags a change in load; follow the latest commit's direction
+            if seconds > self.target_seconds:
+                wanted = min(wanted, self._size)
+            else:
+                wanted = max(wanted, self._size)
+            self._resize(wanted, f"{rows} rows committed in {seconds:.2f}s, "
+                                 f"target {self.target_seconds:.1f}s")
+
+    def back_off(self, error: Exception, rows: int) -> bool:
+        """
+        Halve the size after a failed INSERT of `rows` rows. Returns True if
+        the error is retryable and a smaller chunk can be tried, after
+        sleeping longer for each consecutive failure
+        """
+        code = mysql_error_code(error)
+        with self._lock:
+            if code not in RETRYABLE_ERRORS or rows <= self.min_size:
+                return False
+            self._consecutive_errors += 1
+            if code in CONNECTION_ERRORS:
+                self._ceiling = max(self.min_size, min(self._ceiling, rows - 1))
+            self._resize(min(self._size, rows) * MAX_SHRINK,
+                         f"{RETRYABLE_ERRORS[code]} on {rows} rows")
+            delay = min(self.max_backoff_seconds, 2 ** (self._consecutive_errors - 1))
+
+        logger.warning(f"[BATCH] {RETRYABLE_ERRORS[code]} ({code}), retrying in chunks of "
+                       f"{self._size} after {delay:.0f}s")
+        time.sleep(delay)
+        return True
+
+    def commit_in_chunks(self, conn: pymysql.Connection, rows: List[Dict],
+                         insert: Callable[[pymysql.Connection, List[Dict]], int]) -> int:
+        """
+        Insert `rows` with insert(conn, chunk) and commit, in chunks of at most
+        `size` rows. A retryable error in insert rolls the chunk back and
+        retries the remaining rows smaller; errors on COMMIT are not retried,
+        since the commit may have gone through. Returns rows inserted.
+
+        Earlier chunks stay committed when a later one fails: the error raised
+        carries how many leading rows were committed (see committed_rows), so
+        callers only report rows[committed_rows(e):] as failed
+        """
+        inserted = 0
+        done = 0
+        try:
+            while done < len(rows):
+                chunk = rows[done:done + self._size]
+                started = time.monotonic()
+                try:
+                    inserted += insert(conn, chunk)
+                except pymysql.err.MySQLError as e:
+                    retry = self.back_off(e, len(chunk))
+                    if mysql_error_code(e) in CONNECTION_ERRORS:
+                        if retry:
+                            # Reconnects in place; init_command (e.g. FOREIGN_KEY_CHECKS) runs again
+                            conn.ping(reconnect=True)
+                    else:
+                        conn.rollback()
+                    if not retry:
+                        raise
+                    continue
+
+                conn.commit()
+                self.observe(len(chunk), time.monotonic() - started)
+                done += len(chunk)
+        except Exception as e:
+            e.committed_rows = done
+            raise
+        return inserted
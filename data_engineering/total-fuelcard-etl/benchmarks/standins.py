@@ -0,0 +1,151 @@
+"""Local stand-ins for the Total portal and ClickHouse used by the replay harness.
+
+- write_export writes a synthetic portal export: the portal's headers, a
+  chosen encoding and separator, optional repeated receipts and rows
+  carried over from the previous day's export.
+- MemoryClickHouse answers the queries and inserts load_to_clickhouse makes,
+  including insert deduplication tokens, without a server.
+"""
+
+import random
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+# Portal export headers, in export order; they normalize to fuel_transactions columns
+EXPORT_HEADER = [
+    "Customer num.",
+    "Customer",
+    "Date",
+    "Hour",
+    "Driver code",
+    "Registration num.",
+    "Card type",
+    "Card num.",
+    "Card name",
+    "Receipt num.",
+    "Past mileage",
+    "Current mileage",
+    "Operation type",
+    "Product code",
+    "Product",
+    "Unit price",
+    "Quantity",
+    "Amount",
+    "Currency num.",
+    "Currency",
+    "Balance",
+    "Station num.",
+    "Place",
+    "Invoice date",
+    "Invoice num.",
+]
+
+PRODUCTS = [("D01", "Diesel", 171.6), ("S01", "Super", 188.8), ("L01", "Lubricant", 950.0)]
+# Accented names exercise the latin-1 exports
+STATIONS = [("ST01", "Nairobi Mombasa Rd"), ("ST02", "Thika Côte"), ("ST03", "Nakuru Éldama"), ("ST04", "Kisumu")]
+CARDS = 400
+
+
+def transaction_rows(day, count, seed=42):
+    """count synthetic transactions on day as lists of export fields, one receipt each."""
+    rng = random.Random(f"{seed}-{day:%Y%m%d}")
+    rows = []
+    for i in range(count):
+        card = rng.randrange(CARDS)
+        product_code, product, unit_price = rng.choice(PRODUCTS)
+        station_number, place = rng.choice(STATIONS)
+        quantity = round(rng.uniform(5, 120), 2)
+        mileage = rng.randrange(10000, 300000)
+        moment = day + timedelta(seconds=rng.randrange(86400))
+        rows.append([
+            "C0042",
+            "SunCulture",
+            moment.strftime("%d/%m/%Y"),
+            moment.strftime("%H:%M:%S"),
+            f"DRV{card:04d}",
+            f"KC{chr(65 + card % 26)} {card:03d}X",
+            "FLEET",
+            f"70430{card:05d}",
+            f"Vehicle {card}",
+            f"R{day:%Y%m%d}{i:06d}",
+            str(mileage),
+            str(mileage + rng.randrange(50, 600)),
+            "SALE",
+            product_code,
+            product,
+            str(unit_price),
+            str(quantity),
+            str(round(quantity * unit_price, 2)),
+            "404",
+            "KES",
+            str(round(rng.uniform(0, 500000), 2)),
+            station_number,
+            place,
+            (day + timedelta(days=1)).strftime("%d/%m/%Y"),
+            f"INV{day:%Y%m}",
+        ])
+    return rows
+
+
+def write_export(path, rows, encoding="utf-8", separator=","):
+    """Write rows under EXPORT_HEADER the way the portal exports them (no quoting, CRLF)."""
+    lines = [separator.join(EXPORT_HEADER)] + [separator.join(row) for row in rows]
+    with open(path, "wb") as f:
+        f.write(("\r\n".join(lines) + "\r\n").encode(encoding))
+
+
+def row_key(row):
+    """(card_number, transaction time, receipt_number) of an export row, as fuel_transactions keys it."""
+    return row[7], datetime.strptime(f"{row[2]} {row[3]}", "%d/%m/%Y %H:%M:%S"), row[9]
+
+
+class _Result:
+    def __init__(self, rows):
+        self.result_rows = rows
+
+
+class MemoryClickHouse:
+    """In-memory fuel_db.fuel_transactions for load_to_clickhouse.
+
+    Supports the existing-key lookup of check_existing_data and insert_df
+    with insert_deduplication_token (the last `window` tokens are remembered,
+    like non_replicated_deduplication_window). Its own bookkeeping is plain
+    Python, so insert timings are indicative only; use a ClickHouse container
+    for real numbers.
+    """
+
+    def __init__(self, window=1000):
+        self.rows = 0
+        self.keys = defaultdict(set)
+        self.tokens = deque(maxlen=window)
+        self.deduplicated_inserts = 0
+
+    def query(self, query, parameters=None):
+        if "FROM fuel_db.fuel_transactions" not in query or "card_number IN" not in query:
+            raise NotImplementedError(f"MemoryClickHouse cannot answer: {query}")
+        start, end = parameters["start"], parameters["end"]
+        return _Result([
+            (card, moment, receipt)
+            for card in parameters["card_numbers"]
+            for moment, receipt in self.keys.get(card, ())
+            if start <= moment <= end
+        ])
+
+    def insert_df(self, table, df, settings=None):
+        token = (settings or {}).get("insert_deduplication_token")
+        if token is not None:
+            if token in self.tokens:
+                self.deduplicated_inserts += 1
+                return
+            self.tokens.append(token)
+
+        moments = df["transaction_datetime"].dt.to_pydatetime()
+        for card, moment, receipt in zip(df["card_number"], moments, df["receipt_number"]):
+            self.keys[card].add((moment, receipt))
+        self.rows += len(df)
+
+    def count(self):
+        return self.rows
+
+    def distinct_keys(self):
+        return sum(len(keys) for keys in self.keys.values())
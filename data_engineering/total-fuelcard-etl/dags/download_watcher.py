@@ -0,0 +1,116 @@
+"""Detect when a browser download has finished.
+
+Chrome writes a download to `<name>.crdownload` and renames it to its final
+name once the last byte is on disk. Given a directory that only one run
+downloads into, the download is complete as soon as a non-empty finished
+file exists and no partial file is left, so there is nothing to sleep for.
+
+On Linux the directory is watched with inotify and each create/rename/close
+event triggers a rescan; elsewhere the directory is stat-polled at a short
+interval. Either way the wait ends within milliseconds of the rename.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import time
+
+logger = logging.getLogger(__name__)
+
+# Suffixes of files a browser is still writing to
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp")
+
+# inotify events that can complete a download (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Seconds between directory scans when inotify is unavailable
+POLL_INTERVAL = 0.1
+
+
+class DownloadTimeout(Exception):
+    """No completed download appeared in the directory within the timeout."""
+
+
+def completed_download(downloads_dir, suffix=".csv"):
+    """Path of the finished download in downloads_dir, or None while it is still in progress."""
+    names = [name for name in os.listdir(downloads_dir) if not name.startswith(".")]
+    if any(name.endswith(PARTIAL_SUFFIXES) for name in names):
+        return None
+
+    # Chrome may create an empty placeholder under the final name while the
+    # .crdownload is written; a finished CSV export always has a header row
+    finished = sorted(
+        name
+        for name in names
+        if name.lower().endswith(suffix)
+        and os.path.getsize(os.path.join(downloads_dir, name)) > 0
+    )
+    if not finished:
+        return None
+    if len(finished) > 1:
+        logger.warning(f"Several downloads in {downloads_dir}, using {finished[0]}: {finished}")
+    return os.path.join(downloads_dir, finished[0])
+
+
+def _watch_directory(path):
+    """Return a non-blocking inotify descriptor watching path, or None if inotify is unavailable."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _drain(fd):
+    # Events only signal that the directory changed; it is rescanned anyway
+    try:
+        while os.read(fd, 64 * 1024):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def wait_for_completed_download(downloads_dir, timeout=300, suffix=".csv"):
+    """Block until a finished download ending in suffix is in downloads_dir and return its path.
+
+    downloads_dir must be private to the caller: any finished file in it is
+    taken to be the download. Raises DownloadTimeout after timeout seconds.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    # Start watching before the first scan so a rename in between is not missed
+    fd = _watch_directory(downloads_dir)
+    if fd is None:
+        logger.info(f"inotify unavailable, polling {downloads_dir} every {POLL_INTERVAL}s")
+
+    try:
+        while True:
+            path = completed_download(downloads_dir, suffix)
+            if path:
+                logger.info(f"Download completed after {time.monotonic() - started:.1f}s: {path}")
+                return path
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DownloadTimeout(
+                    f"No completed {suffix} download in {downloads_dir} after {timeout}s"
+                )
+            if fd is None:
+                time.sleep(min(POLL_INTERVAL, remaining))
+            elif select.select([fd], [], [], remaining)[0]:
+                _drain(fd)
+    finally:
+        if fd is not None:
+            os.close(fd)
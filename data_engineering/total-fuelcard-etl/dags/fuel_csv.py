@@ -0,0 +1,121 @@
+"""Streaming reader for Total portal transaction exports.
+
+The encoding, separator and header are detected from the first block of the
+file, once. Rows are then read in fixed-size chunks with every column
+declared as text, so pandas never infers types or holds the whole export in
+memory; numerics and dates are parsed per chunk with one vectorised call
+each, the transaction time from the date and hour columns together.
+"""
+
+import codecs
+import csv
+import io
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed and handed to the caller at a time
+CHUNK_ROWS = 50000
+
+# Bytes read up front to detect the encoding, separator and header
+SAMPLE_BYTES = 64 * 1024
+
+# Separators the portal has been seen to use
+SEPARATORS = ",;\t"
+
+DATE_FORMAT = "%d/%m/%Y"
+DATETIME_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+
+def normalize_column(name):
+    """Portal header to fuel_transactions column name, e.g. "Card num." -> "card_number"."""
+    return name.replace(" ", "_").replace(".", "").replace("num", "number").lower()
+
+
+def detect_format(path):
+    """Return (encoding, separator, header) of a CSV export from its first block.
+
+    UTF-8 (with or without BOM) is used when the sample decodes as UTF-8,
+    latin-1 otherwise. Later bytes invalid in the chosen encoding are replaced
+    rather than failing the read.
+    """
+    with open(path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            # Not final: the sample may end in the middle of a multi-byte character
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin1"
+
+    text = sample.decode(encoding, errors="ignore")
+    first_line = text.splitlines()[0] if text else ""
+    try:
+        separator = csv.Sniffer().sniff(first_line, delimiters=SEPARATORS).delimiter
+    except csv.Error:
+        separator = ","
+
+    header = next(csv.reader(io.StringIO(first_line), delimiter=separator), [])
+    return encoding, separator, header
+
+
+def parse_chunk(chunk, numeric_columns):
+    """Convert one chunk of text columns to the types build_insert_frame expects."""
+    for col in numeric_columns:
+        if col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+
+    if "date" in chunk.columns:
+        dates = chunk["date"]
+        if "hour" in chunk.columns:
+            # One parse of "dd/mm/YYYY HH:MM:SS"; hours exported as floats lose their ".0"
+            hours = chunk["hour"].str.replace(r"\.0$", "", regex=True)
+            combined = dates + " " + hours
+            transaction_dt = pd.to_datetime(combined, format=DATETIME_FORMAT, errors="coerce")
+            # Rows in another time format (e.g. HH:MM) fall back to a per-row parse
+            unparsed = transaction_dt.isna() & combined.notna()
+            if unparsed.any():
+                transaction_dt[unparsed] = pd.to_datetime(
+                    combined[unparsed], dayfirst=True, errors="coerce"
+                )
+            chunk["transaction_datetime"] = transaction_dt
+        chunk["date"] = pd.to_datetime(dates, format=DATE_FORMAT, errors="coerce")
+
+    if "invoice_date" in chunk.columns:
+        chunk["invoice_date"] = pd.to_datetime(
+            chunk["invoice_date"], format=DATE_FORMAT, errors="coerce"
+        )
+
+    return chunk
+
+
+def read_transactions(path, numeric_columns, chunk_rows=CHUNK_ROWS):
+    """Yield the export at path as DataFrames of at most chunk_rows rows.
+
+    Columns carry normalized names; numeric_columns are float64, date and
+    invoice_date datetime64, and transaction_datetime combines date and hour.
+    """
+    encoding, separator, header = detect_format(path)
+    names = [normalize_column(name) for name in header]
+    logger.info(f"Reading {path} as {encoding}, separator {separator!r}, columns {names}")
+
+    reader = pd.read_csv(
+        path,
+        sep=separator,
+        encoding=encoding,
+        encoding_errors="replace",
+        header=0,
+        names=names,
+        dtype=str,
+        chunksize=chunk_rows,
+    )
+    with reader:
+        for chunk in reader:
+            if not chunk.empty:
+                yield parse_chunk(chunk, numeric_columns)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import time
 import logging
 import pandas as pd
@@ -14,6 +15,9 @@ from selenium.webdriver.common.keys import Keys
 from io import StringIO
 from dotenv import load_dotenv
 
+from download_watcher import DownloadTimeout, wait_for_completed_download
+from fuel_csv import CHUNK_ROWS, detect_format
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -165,47 +169,12 @@ def wait_for_export_button(driver, timeout=180):
 
 
 def wait_for_download(downloads_dir, timeout=60):
-    """Monitor the downloads directory for new files."""
-    files_before = set(os.listdir(downloads_dir))
-    logger.info(f"Files before download: {files_before}")
-
-    start_time = time.time()
-    new_file = None
-
-    while time.time() - start_time < timeout:
-        current_files = set(os.listdir(downloads_dir))
-        new_files = current_files - files_before
-
-        # Log all files for debugging
-        if new_files:
-            logger.info(f"New files detected: {new_files}")
-
-        # Look for new CSV files specifically
-        csv_files = [f for f in new_files if f.lower().endswith(".csv")]
-
-        if csv_files:
-            new_file = os.path.join(downloads_dir, csv_files[0])
-            logger.info(f"Found new CSV file: {new_file}")
-
-            # Wait a bit to ensure the file is completely written
-            time.sleep(2)
-
-            # Check if file size has stabilized (no longer being written to)
-            initial_size = os.path.getsize(new_file)
-            time.sleep(1)
-            if os.path.getsize(new_file) == initial_size:
-                logger.info("File size stabilized, download complete")
-                return new_file
-
-        # Log progress periodically
-        elapsed = int(time.time() - start_time)
-        if elapsed % 5 == 0:
-            logger.info(f"Waiting for download... ({elapsed} seconds)")
-
-        time.sleep(1)
-
-    logger.warning(f"No new CSV file detected after {timeout} seconds")
-    return None
+    """Wait for the export to finish downloading into this run's directory."""
+    try:
+        return wait_for_completed_download(downloads_dir, timeout=timeout)
+    except DownloadTimeout:
+        logger.warning(f"No new CSV file detected after {timeout} seconds")
+        return None
 
 
 def extract_table_data(driver, downloads_dir):
@@ -358,9 +327,6 @@ def get_transaction_data(driver, downloads_dir):
         # Take a screenshot of the export button
         driver.save_screenshot("export_button_found.png")
 
-        # Record files before clicking
-        files_before = set(os.listdir(downloads_dir))
-
         # Try multiple click methods
         click_methods = [
             ("direct click", lambda: export_button.click()),
@@ -412,41 +378,11 @@ def get_transaction_data(driver, downloads_dir):
 def validate_transaction_data(file_path):
     """Validate and standardize the extracted transaction data."""
     try:
-        # Try multiple read options
-        df = None
-        read_attempts = [
-            {"params": {"encoding": "utf-8"}, "name": "Default UTF-8"},
-            {"params": {"encoding": "latin1"}, "name": "Latin-1 encoding"},
-            {
-                "params": {"sep": ";", "encoding": "utf-8"},
-                "name": "Semicolon separator",
-            },
-            {
-                "params": {"sep": ";", "encoding": "latin1"},
-                "name": "Semicolon + Latin-1",
-            },
-        ]
-
-        for attempt in read_attempts:
-            try:
-                df = pd.read_csv(file_path, **attempt["params"])
-                logger.info(f"Successfully read CSV with {attempt['name']}")
-                break
-            except Exception as e:
-                logger.warning(f"Failed to read CSV with {attempt['name']}: {str(e)}")
-
-        if df is None or len(df) == 0:
-            logger.error("Could not read CSV file or file is empty")
-            return None
-
-        # Log dataframe info
-        logger.info(f"Data shape: {df.shape}")
-        logger.info(f"Columns: {df.columns.tolist()}")
-
-        # Check for required data
-        if len(df) == 0:
-            logger.warning("CSV file contains no data rows")
-            return None
+        # Detect the encoding and separator once instead of re-reading the file
+        # under each candidate
+        encoding, separator, header = detect_format(file_path)
+        logger.info(f"Reading CSV as {encoding} with separator {separator!r}")
+        logger.info(f"Columns: {header}")
 
         # Standardize column names
         column_mapping = {
@@ -466,17 +402,35 @@ def validate_transaction_data(file_path):
 
         # Create a new column mapping with only columns that exist
         actual_mapping = {
-            old: new for old, new in column_mapping.items() if old in df.columns
+            old: new for old, new in column_mapping.items() if old in header
         }
 
         if actual_mapping:
-            df = df.rename(columns=actual_mapping)
             logger.info(f"Renamed columns: {actual_mapping}")
 
-        # Save standardized file
+        # Stream the standardized copy chunk by chunk
         standardized_path = file_path.replace(".csv", "_standardized.csv")
-        df.to_csv(standardized_path, index=False)
-        logger.info(f"Saved standardized data to: {standardized_path}")
+        rows = 0
+        reader = pd.read_csv(
+            file_path,
+            sep=separator,
+            encoding=encoding,
+            encoding_errors="replace",
+            dtype=str,
+            chunksize=CHUNK_ROWS,
+        )
+        with reader:
+            for chunk in reader:
+                chunk.rename(columns=actual_mapping).to_csv(
+                    standardized_path, mode="a" if rows else "w", header=not rows, index=False
+                )
+                rows += len(chunk)
+
+        if rows == 0:
+            logger.warning("CSV file contains no data rows")
+            return None
+
+        logger.info(f"Saved {rows} standardized rows to: {standardized_path}")
 
         return standardized_path
 
@@ -498,9 +452,13 @@ def extract_total_data():
             "Missing credentials in .env file. Please set TOTAL_USERNAME and TOTAL_PASSWORD."
         )
 
-    # Create download directory
-    downloads_dir = os.path.join(os.getcwd(), "downloads")
-    os.makedirs(downloads_dir, exist_ok=True)
+    # Create a download directory for this run only, so concurrent runs never
+    # pick up each other's files
+    downloads_root = os.path.join(os.getcwd(), "downloads")
+    os.makedirs(downloads_root, exist_ok=True)
+    downloads_dir = tempfile.mkdtemp(
+        prefix=datetime.now().strftime("run_%Y%m%d%H%M%S_"), dir=downloads_root
+    )
     downloads_dir_abs = os.path.abspath(downloads_dir)
 
     # Set date range for extraction - from January 1 of current year to present
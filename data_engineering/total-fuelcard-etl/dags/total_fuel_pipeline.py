@@ -1,11 +1,10 @@
 from datetime import datetime, timedelta
 from airflow import DAG
 from airflow.operators.python import PythonOperator, BranchPythonOperator
-from airflow.models import Variable, XCom
-from airflow.utils.db import provide_session
-from airflow.models.xcom import XCom as XComModel
-from airflow.utils.session import create_session
+from airflow.models import Variable
+import hashlib
 import os
+import shutil
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -14,7 +13,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 import logging
-import clickhouse_connect
+
+from clickhouse_client import get_client
+from download_watcher import wait_for_completed_download
+from fuel_csv import read_transactions
+from total_portal_client import TotalPortalClient
 
 # Logging
 logger = logging.getLogger(__name__)
@@ -29,48 +32,42 @@ default_args = {
     "retry_delay": timedelta(minutes=5),
 }
 
+# Max date chunks extracted and loaded at the same time
+BACKFILL_CONCURRENCY = 4
 
-# Function to get the date range for extraction
-def get_date_range(**kwargs):
-    """Determine whether this is the first run or a subsequent run,
-    and return the appropriate date range."""
+# fuel_db.load_watermark entry holding the latest loaded transaction time
+WATERMARK_PIPELINE = "total_fuel"
+
+# Seconds to wait for the browser export to finish downloading
+DOWNLOAD_TIMEOUT = 300
+FIRST_RUN_DOWNLOAD_TIMEOUT = 900
 
-    is_first_run = Variable.get("total_first_run", default_var="true").lower() == "true"
 
+# Function to get the date range for extraction
+def get_date_range(**kwargs):
+    """Return the date range not loaded yet: from the day of the watermark
+    (the latest transaction loaded) to today.
+
+    The portal exports whole days, so the watermark's day is fetched again to
+    pick up transactions reported after it; the overlap is deduplicated on
+    load. Without a watermark this is the first run, which fetches the last
+    total_historical_days days.
+    """
+    client = get_client()
+    ensure_clickhouse_schema(client)
+    watermark = get_watermark(client)
+    is_first_run = watermark is None
+
+    end_date = datetime.now()
     if is_first_run:
         logger.info("This is the first run, fetching historical data")
 
         days_to_fetch = int(Variable.get("total_historical_days", default_var="30"))
-        end_date = datetime.now()
         start_date = end_date - timedelta(days=days_to_fetch)
 
-        Variable.set("total_first_run", "false")
-
     else:
-        logger.info("This is a subsequent run, fetching data since last successful run")
-
-        # Get the last successful run date from XCom
-        @provide_session
-        def get_last_successful_date(session=None):
-            last_date_record = (
-                session.query(XComModel)
-                .filter(
-                    XComModel.dag_id == "total_fuel_data_pipeline",
-                    XComModel.task_id == "record_successful_date",
-                    XComModel.key == "last_successful_date",
-                )
-                .order_by(XComModel.execution_date.desc())
-                .first()
-            )
-
-            if last_date_record and last_date_record.value:
-                return datetime.fromisoformat(last_date_record.value)
-            else:
-                # If no record found, default to yesterday
-                return datetime.now() - timedelta(days=1)
-
-        start_date = get_last_successful_date()
-        end_date = datetime.now()
+        logger.info(f"Fetching data since the watermark {watermark.isoformat()}")
+        start_date = watermark
 
     start_date_str = start_date.strftime("%d/%m/%Y")
     end_date_str = end_date.strftime("%d/%m/%Y")
@@ -84,31 +81,139 @@ def get_date_range(**kwargs):
     }
 
 
-# Function to record the current date as the last successful run
-def record_successful_date(**kwargs):
-    """Record the current date as the last successful run date."""
-    current_date = datetime.now().isoformat()
-    logger.info(f"Recording successful run date: {current_date}")
+def get_watermark(client):
+    """Latest transaction_datetime loaded by this pipeline, or None before the first load."""
+    result = client.query(
+        "SELECT max(watermark), count() FROM fuel_db.load_watermark WHERE pipeline = %(pipeline)s",
+        parameters={"pipeline": WATERMARK_PIPELINE},
+    )
+    watermark, count = result.result_rows[0]
+    return watermark if count else None
 
-    return current_date
 
+# Advance the watermark once every chunk has loaded
+def advance_watermark(**kwargs):
+    """Move the watermark to the latest transaction loaded by this run.
 
-# Extract data from Total portal
-def extract_total_data(**kwargs):
-    logger.info("Starting data extraction from Total Portal")
+    Runs only after all extract_and_load tasks succeeded, so a failed chunk
+    leaves the watermark where it was and the next run fetches the window
+    again. The watermark never moves backwards.
+    """
+    ti = kwargs["ti"]
+    loaded = [
+        result["max_transaction_datetime"]
+        for result in ti.xcom_pull(task_ids="extract_and_load") or []
+        if result and result["max_transaction_datetime"]
+    ]
+    if not loaded:
+        logger.info("No transactions loaded, watermark unchanged")
+        return None
+
+    client = get_client()
+    current = get_watermark(client)
+    # Transactions stamped in the future (clock skew) must not skip real ones
+    new_watermark = min(max(datetime.fromisoformat(value) for value in loaded), datetime.now())
+    if current is not None and new_watermark <= current:
+        logger.info(f"Watermark stays at {current.isoformat()}")
+        return current.isoformat()
+
+    client.insert(
+        "fuel_db.load_watermark",
+        [[WATERMARK_PIPELINE, new_watermark]],
+        column_names=["pipeline", "watermark"],
+    )
+    logger.info(f"Advanced watermark to {new_watermark.isoformat()}")
+    return new_watermark.isoformat()
+
+
+# Split the extraction window into chunks that are extracted and loaded in parallel
+def plan_backfill_chunks(**kwargs):
+    """Split the date range into chunks of total_backfill_chunk_days days (default 1).
 
-    # Get date range from earlier task
+    Each chunk becomes one mapped extract_and_load task, so a long backfill
+    runs in parallel and a failed chunk is retried on its own.
+    """
     ti = kwargs["ti"]
     date_range = ti.xcom_pull(task_ids="get_date_range")
-    start_date_str = date_range["start_date"]
-    end_date_str = date_range["end_date"]
-    is_first_run = date_range["is_first_run"]
+    chunk_days = max(1, int(Variable.get("total_backfill_chunk_days", default_var="1")))
+
+    start_date = datetime.strptime(date_range["start_date"], "%d/%m/%Y")
+    end_date = datetime.strptime(date_range["end_date"], "%d/%m/%Y")
+
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append(
+            {
+                "start_date": chunk_start.strftime("%d/%m/%Y"),
+                "end_date": chunk_end.strftime("%d/%m/%Y"),
+                "is_first_run": date_range["is_first_run"],
+            }
+        )
+        chunk_start = chunk_end + timedelta(days=1)
+
+    logger.info(f"Planned {len(chunks)} chunk(s) of up to {chunk_days} day(s)")
+    return chunks
+
 
+def extract_and_load(start_date, end_date, is_first_run, **kwargs):
+    """Extract one date chunk from the portal and load it into ClickHouse."""
+    # Each mapped task downloads into its own directory so parallel chunks never
+    # pick up each other's files
+    downloads_dir = os.path.join(
+        "/opt/airflow/downloads",
+        kwargs["run_id"].replace(":", "_"),
+        str(kwargs["ti"].map_index),
+    )
+    try:
+        csv_path = extract_total_data(start_date, end_date, is_first_run, downloads_dir)
+        return load_to_clickhouse(csv_path)
+    finally:
+        shutil.rmtree(downloads_dir, ignore_errors=True)
+
+
+# Extract data from Total portal
+def extract_total_data(start_date_str, end_date_str, is_first_run, downloads_dir):
+    """Download the transactions CSV, over HTTP when the portal endpoints are
+    configured and through the browser otherwise (or if the HTTP export fails)."""
+    logger.info("Starting data extraction from Total Portal")
     logger.info(f"Extracting data from {start_date_str} to {end_date_str}")
 
-    downloads_dir = "/opt/airflow/downloads"
     os.makedirs(downloads_dir, exist_ok=True)
 
+    login_url = Variable.get("total_login_url", default_var=None)
+    export_url = Variable.get("total_export_url", default_var=None)
+    if login_url and export_url:
+        try:
+            return extract_with_http(
+                login_url, export_url, downloads_dir, start_date_str, end_date_str
+            )
+        except Exception as e:
+            logger.warning(f"HTTP export failed, falling back to Selenium: {str(e)}")
+
+    return extract_with_selenium(downloads_dir, start_date_str, end_date_str, is_first_run)
+
+
+def extract_with_http(login_url, export_url, downloads_dir, begin_str, end_str, session=None):
+    """Replay the portal's login and export requests and stream the CSV to disk.
+
+    session replaces the pooled requests session, e.g. one with a
+    RecordedPortalAdapter mounted to replay captured exports.
+    """
+    username = Variable.get("total_username", default_var="YOUR_USERNAME")
+    password = Variable.get("total_password", default_var="YOUR_PASSWORD")
+
+    file_name = f"total_transactions_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+    with TotalPortalClient(login_url, export_url, username, password, session=session) as client:
+        client.login()
+        return client.export_transactions(
+            begin_str, end_str, os.path.join(downloads_dir, file_name)
+        )
+
+
+def extract_with_selenium(downloads_dir, begin_str, end_str, is_first_run):
+    """Drive the portal UI in headless Chromium and pick up the downloaded CSV."""
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
@@ -155,21 +260,18 @@ def extract_total_data(**kwargs):
         )
         driver.find_element(By.XPATH, "//a[contains(@href, 'transactions')]").click()
 
-        yesterday = datetime.now() - timedelta(days=1)
-        yesterday_str = yesterday.strftime("%d/%m/%Y")
-
-        logger.info(f"Setting date range: {yesterday_str}")
+        logger.info(f"Setting date range: {begin_str} to {end_str}")
 
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.NAME, "begin"))
         )
         begin_date = driver.find_element(By.NAME, "begin")
         begin_date.clear()
-        begin_date.send_keys(yesterday_str)
+        begin_date.send_keys(begin_str)
 
         end_date = driver.find_element(By.NAME, "end")
         end_date.clear()
-        end_date.send_keys(yesterday_str)
+        end_date.send_keys(end_str)
 
         driver.find_element(By.XPATH, "//button[@type='submit']").click()
 
@@ -182,20 +284,9 @@ def extract_total_data(**kwargs):
 
         logger.info("Waiting for CSV download to complete")
 
-        wait_time = 30 if is_first_run else 10
-        time.sleep(wait_time)
-
-        # Confirming downloaded file
-        files = os.listdir(downloads_dir)
-        csv_files = [f for f in files if f.endswith(".csv") and "total" in f.lower()]
-
-        if not csv_files:
-            logger.error("No CSV files found in the download directory")
-            raise Exception("Download failed: No CSV files found")
-
-        latest_file = max(
-            [os.path.join(downloads_dir, f) for f in csv_files], key=os.path.getctime
-        )
+        # downloads_dir belongs to this task only, so the finished file is ours
+        timeout = FIRST_RUN_DOWNLOAD_TIMEOUT if is_first_run else DOWNLOAD_TIMEOUT
+        latest_file = wait_for_completed_download(downloads_dir, timeout=timeout)
         logger.info(f"Donwloaded file: {latest_file}")
 
         return latest_file
@@ -207,190 +298,227 @@ def extract_total_data(**kwargs):
         driver.quit()
 
 
-def check_existing_data(client, data):
-    """Check for existing records to avoid duplicates."""
-    checked_data = []
-
-    for record in data:
-        # Extract key identifiers
-        card_number = record[6]  # card_number
-        transaction_datetime = record[2]  # transaction_datetime
-        receipt_number = record[8]  # receipt_number
-
-        # Check if this transaction already exists
-        query = f"""
-        SELECT 1 
-        FROM fuel_db.fuel_transactions 
-        WHERE card_number = '{card_number}' 
-        AND transaction_datetime = '{transaction_datetime}' 
-        AND receipt_number = '{receipt_number}'
-        LIMIT 1
-        """
+# fuel_db.fuel_transactions columns by insert type
+STRING_COLUMNS = [
+    "customer_number",
+    "customer",
+    "driver_code",
+    "registration_number",
+    "card_type",
+    "card_number",
+    "card_name",
+    "receipt_number",
+    "operation_type",
+    "product_code",
+    "product",
+    "currency_number",
+    "currency",
+    "station_number",
+    "place",
+    "invoice_number",
+]
+
+FLOAT_COLUMNS = [
+    "past_mileage",
+    "current_mileage",
+    "unit_price",
+    "quantity",
+    "amount",
+    "balance",
+]
+
+# Columns of fuel_db.fuel_transactions in insert order
+COLUMN_NAMES = [
+    "customer_number",
+    "customer",
+    "transaction_datetime",
+    "driver_code",
+    "registration_number",
+    "card_type",
+    "card_number",
+    "card_name",
+    "receipt_number",
+    "past_mileage",
+    "current_mileage",
+    "operation_type",
+    "product_code",
+    "product",
+    "unit_price",
+    "quantity",
+    "amount",
+    "currency_number",
+    "currency",
+    "balance",
+    "station_number",
+    "place",
+    "invoice_date",
+    "invoice_number",
+    "created_at",
+]
+
+
+def build_insert_frame(df):
+    """Build the fuel_transactions insert payload column by column.
+
+    Missing string columns become "", missing numeric columns 0.0. Rows without
+    a parseable transaction time fall back to the date at midnight when the
+    export has no hour column, else to the load time, like the old row loop.
+    """
+    now = pd.Timestamp(datetime.now()).floor("s")
+    n_rows = len(df)
+    frame = pd.DataFrame(index=df.index)
+
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            frame[col] = df[col].fillna("").astype(str)
+        else:
+            frame[col] = ""
 
-        result = client.execute(query)
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            frame[col] = df[col].astype("float64")
+        else:
+            frame[col] = 0.0
 
-        # If no results, this is a new record
-        if not result:
-            checked_data.append(record)
+    if "transaction_datetime" in df.columns:
+        transaction_dt = df["transaction_datetime"]
+    elif "date" in df.columns:
+        transaction_dt = df["date"]
+    else:
+        transaction_dt = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    frame["transaction_datetime"] = transaction_dt.fillna(now)
 
-    return checked_data
+    if "invoice_date" in df.columns:
+        invoice_dt = df["invoice_date"].fillna(now.normalize())
+    else:
+        invoice_dt = pd.Series([now.normalize()] * n_rows, index=df.index)
+    frame["invoice_date"] = invoice_dt.dt.date
 
+    frame["created_at"] = now
 
-def load_to_clickhouse(**kwargs):
-    ti = kwargs["ti"]
-    csv_path = ti.xcom_pull(task_ids="extract_total_data")
-    date_range = ti.xcom_pull(task_ids="get_date_range")
-    is_first_run = date_range["is_first_run"]
+    return frame[COLUMN_NAMES].reset_index(drop=True)
 
-    logger.info(f"Loading data from {csv_path} to ClickHouse")
 
-    try:
-        df = pd.read_csv(csv_path)
-        logger.info(f"Read {len(df)} records from CSV")
+# A transaction is identified by its card, time and receipt
+KEY_COLUMNS = ["card_number", "transaction_datetime", "receipt_number"]
 
-        if df.empty:
-            logger.info("No data to load")
-            return "No data to load"
+# Recent insert tokens remembered per table, so a retried insert is dropped by ClickHouse
+DEDUPLICATION_WINDOW = 1000
 
-        df.columns = [
-            col.replace(" ", "_").replace(".", "").replace("num", "number").lower()
-            for col in df.columns
-        ]
 
-        logger.info("Processing date and time columns")
+def check_existing_data(client, frame):
+    """Drop rows that are already in fuel_transactions (or repeated in the file).
 
-        if "date" in df.columns:
-            df["date"] = pd.to_datetime(df["date"], format="%d/%m/%Y", errors="coerce")
+    Existing keys for the file's date range and cards are fetched in one query
+    and removed with an anti-join, instead of one lookup per row.
+    """
+    frame = frame.drop_duplicates(subset=KEY_COLUMNS).reset_index(drop=True)
+    if frame.empty:
+        return frame
 
-        if "hour" in df.columns:
-            df["hour"] = df["hour"].astype(str).str.replace(r"\.0$", "", regex=True)
+    result = client.query(
+        """
+        SELECT card_number, transaction_datetime, receipt_number
+        FROM fuel_db.fuel_transactions
+        WHERE transaction_datetime BETWEEN %(start)s AND %(end)s
+        AND card_number IN %(card_numbers)s
+        """,
+        parameters={
+            "start": frame["transaction_datetime"].min().to_pydatetime(),
+            "end": frame["transaction_datetime"].max().to_pydatetime(),
+            "card_numbers": tuple(frame["card_number"].unique()),
+        },
+    )
+    existing = pd.DataFrame(result.result_rows, columns=KEY_COLUMNS)
+    if existing.empty:
+        return frame
 
-            if "date" in df.columns:
-                df["transaction_datetime"] = pd.to_datetime(
-                    df["date"].dt.strftime("%Y-%m-%d") + " " + df["hour"],
-                    errors="coerce",
-                )
+    existing["transaction_datetime"] = pd.to_datetime(existing["transaction_datetime"]).astype(
+        frame["transaction_datetime"].dtype
+    )
+    merged = frame.merge(existing.drop_duplicates(), on=KEY_COLUMNS, how="left", indicator=True)
+    return frame[(merged["_merge"] == "left_only").to_numpy()].reset_index(drop=True)
 
-        if "invoice_date" in df.columns:
-            df["invoice_date"] = pd.to_datetime(
-                df["invoice_date"], format="%d/%m/%Y", errors="coerce"
-            )
 
-        numeric_columns = [
-            "current_mileage",
-            "past_mileage",
-            "unit_price",
-            "quantity",
-            "amount",
-            "balance",
-        ]
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        client = clickhouse_connect.get_client(
-            host="clickhouse",
-            port=8123,
-            username="default",
-            password="clickhouse",
-        )
+def insert_deduplication_token(frame):
+    """Token identifying this set of transactions, so re-inserting the same rows is a no-op."""
+    key_hashes = pd.util.hash_pandas_object(frame[KEY_COLUMNS], index=False)
+    return hashlib.sha256(key_hashes.to_numpy().tobytes()).hexdigest()
+
 
-        data = []
+def load_to_clickhouse(csv_path):
+    """Load one exported CSV into fuel_transactions.
 
-        for _, row in df.iterrows():
+    The file is read in chunks of fuel_csv.CHUNK_ROWS rows, each
+    deduplicated and inserted on its own. Safe to repeat: rows already in the
+    table are dropped and every insert carries a deduplication token, so
+    retried or overlapping loads never insert a transaction twice.
 
-            if "transaction_datetime" in df.columns and pd.notna(
-                row.get("transaction_datetime")
-            ):
-                transaction_dt = row.get("transaction_datetime")
-            elif "date" in df.columns and pd.notna(row.get("date")):
-                date_str = row.get("date").strftime("%Y-%m-%d")
-                hour_str = row.get("hour", "00:00:00")
-                transaction_dt = pd.to_datetime(
-                    f"{date_str} {hour_str}", errors="coerce"
+    Returns the rows read and inserted, the latest transaction time in the
+    file (which advance_watermark collects) and the seconds spent reading and
+    transforming vs deduplicating and inserting.
+    """
+    logger.info(f"Loading data from {csv_path} to ClickHouse")
+
+    try:
+        client = get_client()
+
+        # Check for duplicates. A ReplacingMergeTree table collapses them
+        # itself, so the lookup is skipped there.
+        dedup_mode = Variable.get("total_dedup_mode", default_var="anti_join")
+
+        rows_read = 0
+        rows_loaded = 0
+        max_transaction_dt = None
+        transform_seconds = 0.0
+        insert_seconds = 0.0
+        # Each chunk is deduplicated and inserted before the next one is read,
+        # so memory stays flat however large the export is
+        started = time.perf_counter()
+        for df in read_transactions(csv_path, FLOAT_COLUMNS):
+            rows_read += len(df)
+            frame = build_insert_frame(df)
+
+            # Latest parsed transaction time, for the watermark; rows without one
+            # (filled with the load time above) are left out
+            time_column = "transaction_datetime" if "transaction_datetime" in df.columns else "date"
+            if time_column in df.columns and df[time_column].notna().any():
+                chunk_max = df[time_column].max()
+                if max_transaction_dt is None or chunk_max > max_transaction_dt:
+                    max_transaction_dt = chunk_max
+            transformed = time.perf_counter()
+            transform_seconds += transformed - started
+
+            if dedup_mode != "replacing":
+                frame = check_existing_data(client, frame)
+
+            if not frame.empty:
+                client.insert_df(
+                    "fuel_db.fuel_transactions",
+                    frame,
+                    settings={"insert_deduplication_token": insert_deduplication_token(frame)},
                 )
-                if pd.isna(transaction_dt):
-                    transaction_dt = datetime.now()
-            else:
-                transaction_dt = datetime.now()
-
-            # Get invoice_date
-            if "invoice_date" in df.columns and pd.notna(row.get("invoice_date")):
-                invoice_dt = row.get("invoice_date").date()
-            else:
-                invoice_dt = datetime.now().date()
-
-            data_tuple = (
-                str(row.get("customer_number", "")),
-                str(row.get("customer", "")),
-                transaction_dt,
-                str(row.get("driver_code", "")),
-                str(row.get("registration_number", "")),
-                str(row.get("card_type", "")),
-                str(row.get("card_number", "")),
-                str(row.get("card_name", "")),
-                str(row.get("receipt_number", "")),
-                float(row.get("past_mileage", 0)),
-                float(row.get("current_mileage", 0)),
-                str(row.get("operation_type", "")),
-                str(row.get("product_code", "")),
-                str(row.get("product", "")),
-                float(row.get("unit_price", 0)),
-                float(row.get("quantity", 0)),
-                float(row.get("amount", 0)),
-                str(row.get("currency_number", "")),
-                str(row.get("currency", "")),
-                float(row.get("balance", 0)),
-                str(row.get("station_number", "")),
-                str(row.get("place", "")),
-                invoice_dt,
-                str(row.get("invoice_number", "")),
-                datetime.now(),  # created_at
-            )
-            data.append(data_tuple)
-
-        # For non-first runs, check for duplicates
-        if not is_first_run:
-            logger.info("Checking for duplicate records to avoid re-insertion")
-            data = check_existing_data(client, data)
-            logger.info(f"Found {len(data)} new records to insert")
-
-        if data:
-            column_names = [
-                "customer_number",
-                "customer",
-                "transaction_datetime",
-                "driver_code",
-                "registration_number",
-                "card_type",
-                "card_number",
-                "card_name",
-                "receipt_number",
-                "past_mileage",
-                "current_mileage",
-                "operation_type",
-                "product_code",
-                "product",
-                "unit_price",
-                "quantity",
-                "amount",
-                "currency_number",
-                "currency",
-                "balance",
-                "station_number",
-                "place",
-                "invoice_date",
-                "invoice_number",
-                "created_at",
-            ]
-
-            client.insert("fuel_db.fuel_transactions", data, column_names=column_names)
-
-            logger.info(f"Successfully loaded {len(data)} records to ClickHouse")
-            return f"Loaded {len(data)} records to ClickHouse"
+                rows_loaded += len(frame)
+            started = time.perf_counter()
+            insert_seconds += started - transformed
+            logger.info(f"Read {rows_read} records, loaded {rows_loaded} new records so far")
+
+        if rows_read == 0:
+            logger.info("No data to load")
+        elif rows_loaded:
+            logger.info(f"Successfully loaded {rows_loaded} records to ClickHouse")
         else:
             logger.info("No new records to insert")
-            return "No new records to insert"
+
+        return {
+            "rows_read": rows_read,
+            "rows_loaded": rows_loaded,
+            "max_transaction_datetime": (
+                max_transaction_dt.isoformat() if max_transaction_dt is not None else None
+            ),
+            "transform_seconds": round(transform_seconds, 3),
+            "insert_seconds": round(insert_seconds, 3),
+        }
 
     except Exception as e:
         logger.error(f"Error loading to ClickHouse: {str(e)}")
@@ -402,21 +530,219 @@ def load_to_clickhouse(**kwargs):
             logger.info(f"Removed file: {csv_path}")
 
 
-# Setting up a Clickhouse database and table
-def setup_clickhouse():
-    try:
+# Low-cardinality text columns stored as dictionaries
+LOW_CARDINALITY_COLUMNS = ["card_type", "product", "currency", "place", "operation_type"]
+
+# Numeric columns compressed with Gorilla (XOR of neighbouring floats) before ZSTD
+GORILLA_COLUMNS = [
+    "past_mileage",
+    "current_mileage",
+    "unit_price",
+    "quantity",
+    "amount",
+    "balance",
+]
+
+# Daily rollups of fuel_transactions: table -> columns it is grouped by
+# besides the day, product and currency
+DAILY_ROLLUPS = {
+    "fuel_daily_by_card": ["card_number", "card_name"],
+    "fuel_daily_by_vehicle": ["registration_number"],
+    "fuel_daily_by_station": ["station_number", "place"],
+}
+
+
+def daily_rollup_statements(table, dimensions):
+    """DDL creating and backfilling one daily rollup and its materialized view.
+
+    The rollup is a SummingMergeTree, so rows for the same day and dimensions
+    are added up as parts merge; query it with sum(...) GROUP BY. The backfill
+    runs before the view exists and starts from an empty table, so a retried
+    migration neither loses nor double-counts rows.
+    """
+    group_by = ["day", *dimensions, "product", "currency"]
+    select = f"""
+        SELECT
+            toDate(transaction_datetime) AS day,
+            {", ".join(dimensions)},
+            product,
+            currency,
+            sum(quantity) AS litres,
+            sum(amount) AS amount,
+            count() AS transactions
+        FROM fuel_db.fuel_transactions
+        GROUP BY {", ".join(group_by)}
+    """
+    columns = [
+        "day Date",
+        *[
+            f"{column} {'LowCardinality(String)' if column in LOW_CARDINALITY_COLUMNS else 'String'}"
+            for column in dimensions
+        ],
+        "product LowCardinality(String)",
+        "currency LowCardinality(String)",
+        "litres Float64",
+        "amount Float64",
+        "transactions UInt64",
+    ]
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS fuel_db.{table} (
+            {", ".join(columns)}
+        ) ENGINE = SummingMergeTree((litres, amount, transactions))
+        PARTITION BY toYYYYMM(day)
+        ORDER BY ({", ".join(group_by)})
+        """,
+        f"TRUNCATE TABLE fuel_db.{table}",
+        f"INSERT INTO fuel_db.{table} {select}",
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS fuel_db.{table}_mv TO fuel_db.{table} AS {select}",
+    ]
+
+
+# fuel_db schema migrations as (version, description, statements), applied in
+# order by setup_clickhouse and recorded in fuel_db.schema_migrations.
+# Append new versions; never edit one that has been applied.
+SCHEMA_MIGRATIONS = [
+    (
+        1,
+        "LowCardinality strings and Gorilla/ZSTD codecs on numeric columns",
+        [
+            "ALTER TABLE fuel_db.fuel_transactions "
+            + ", ".join(
+                [f"MODIFY COLUMN {column} LowCardinality(String)" for column in LOW_CARDINALITY_COLUMNS]
+                + [f"MODIFY COLUMN {column} Float64 CODEC(Gorilla, ZSTD(1))" for column in GORILLA_COLUMNS]
+                + ["MODIFY COLUMN created_at DateTime DEFAULT now() CODEC(Delta, ZSTD(1))"]
+            )
+        ],
+    ),
+    (
+        2,
+        "Daily spend and litres per card, vehicle and station",
+        [
+            statement
+            for table, dimensions in DAILY_ROLLUPS.items()
+            for statement in daily_rollup_statements(table, dimensions)
+        ],
+    ),
+    (
+        3,
+        "Load watermark, seeded from the transactions already loaded",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS fuel_db.load_watermark (
+                pipeline String,
+                watermark DateTime,
+                updated_at DateTime DEFAULT now()
+            ) ENGINE = ReplacingMergeTree(updated_at)
+            ORDER BY pipeline
+            """,
+            f"""
+            INSERT INTO fuel_db.load_watermark (pipeline, watermark)
+            SELECT '{WATERMARK_PIPELINE}', max(transaction_datetime)
+            FROM fuel_db.fuel_transactions
+            HAVING count() > 0
+            """,
+        ],
+    ),
+]
+
+
+def apply_schema_migrations(client):
+    """Apply the SCHEMA_MIGRATIONS versions not yet recorded in fuel_db.schema_migrations."""
+    client.command(
+        """
+        CREATE TABLE IF NOT EXISTS fuel_db.schema_migrations (
+            version UInt32,
+            description String,
+            applied_at DateTime DEFAULT now()
+        ) ENGINE = MergeTree()
+        ORDER BY version
+    """
+    )
+    applied = {
+        row[0]
+        for row in client.query("SELECT version FROM fuel_db.schema_migrations").result_rows
+    }
 
-        client = clickhouse_connect.get_client(
-            host="clickhouse",
-            port=8123,  # Note: using HTTP port instead of native protocol
-            username="default",
-            password="clickhouse",
+    for version, description, statements in SCHEMA_MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"Applying schema migration {version}: {description}")
+        for statement in statements:
+            # Wait for column rewrites to finish before the next step reads the table
+            client.command(statement, settings={"mutations_sync": 2})
+        client.insert(
+            "fuel_db.schema_migrations",
+            [[version, description]],
+            column_names=["version", "description"],
         )
 
+    return max([version for version, _, _ in SCHEMA_MIGRATIONS], default=0)
+
+
+# fuel_db is set up when the applied schema version is behind this one
+SCHEMA_VERSION = max(version for version, _, _ in SCHEMA_MIGRATIONS)
+
+
+def applied_schema_version(client):
+    """Highest version recorded in fuel_db.schema_migrations; 0 for a new or empty ClickHouse."""
+    exists = client.query(
+        "SELECT count() FROM system.tables WHERE database = 'fuel_db' AND name = 'schema_migrations'"
+    ).result_rows[0][0]
+    if not exists:
+        return 0
+    return client.query("SELECT max(version) FROM fuel_db.schema_migrations").result_rows[0][0] or 0
+
+
+def ensure_clickhouse_schema(client):
+    """Run setup_clickhouse only when fuel_db is behind SCHEMA_VERSION.
+
+    The applied version comes from fuel_db.schema_migrations itself, so a new
+    or recreated ClickHouse is always set up.
+    """
+    applied = applied_schema_version(client)
+    if applied >= SCHEMA_VERSION:
+        return
+
+    logger.info(f"ClickHouse schema version {applied} is behind {SCHEMA_VERSION}, setting up")
+    setup_clickhouse(client)
+
+
+# Setting up a Clickhouse database and table
+def setup_clickhouse(client):
+    """Create fuel_db.fuel_transactions.
+
+    With the total_dedup_mode Variable set to "replacing", a new table is
+    created as a ReplacingMergeTree keyed on the transaction identity, so
+    re-loaded rows collapse on merge (read with FINAL). Either way the table
+    remembers recent insert deduplication tokens, making retried loads no-ops.
+
+    SCHEMA_MIGRATIONS then bring the table to the current column types and
+    codecs and maintain the daily rollups (fuel_daily_by_card/_vehicle/_station)
+    that fleet reports read instead of raw rows, e.g.
+
+        SELECT day, card_number, sum(litres), sum(amount)
+        FROM fuel_db.fuel_daily_by_card
+        WHERE day >= today() - 30
+        GROUP BY day, card_number
+
+    Rollups add up every inserted row. ClickHouse drops a deduplicated insert
+    before it reaches the views, but rows a ReplacingMergeTree would only
+    collapse on merge are counted twice.
+    """
+    dedup_mode = Variable.get("total_dedup_mode", default_var="anti_join")
+    if dedup_mode == "replacing":
+        engine = "ReplacingMergeTree(created_at)"
+        order_by = "(transaction_datetime, card_number, receipt_number)"
+    else:
+        engine = "MergeTree()"
+        order_by = "(transaction_datetime, card_number)"
+
+    try:
         client.command("CREATE DATABASE IF NOT EXISTS fuel_db")
 
         client.command(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS fuel_db.fuel_transactions (
                 customer_number String,
                 customer String,
@@ -443,12 +769,31 @@ def setup_clickhouse():
                 invoice_date Date,
                 invoice_number String,
                 created_at DateTime DEFAULT now()
-            ) ENGINE = MergeTree()
-            ORDER BY (transaction_datetime, card_number)
+            ) ENGINE = {engine}
+            ORDER BY {order_by}
             PARTITION BY toYYYYMM(transaction_datetime)
+            SETTINGS non_replicated_deduplication_window = {DEDUPLICATION_WINDOW}
         """
         )
-        logger.info("Clickhouse database and table setup complete")
+
+        # Tables created before the deduplication window was set
+        client.command(
+            f"ALTER TABLE fuel_db.fuel_transactions "
+            f"MODIFY SETTING non_replicated_deduplication_window = {DEDUPLICATION_WINDOW}"
+        )
+
+        current_engine = client.query(
+            "SELECT engine FROM system.tables WHERE database = 'fuel_db' AND name = 'fuel_transactions'"
+        ).result_rows[0][0]
+        if dedup_mode == "replacing" and current_engine != "ReplacingMergeTree":
+            logger.warning(
+                f"total_dedup_mode is 'replacing' but fuel_transactions is a {current_engine}; "
+                "recreate the table to change its engine"
+            )
+
+        schema_version = apply_schema_migrations(client)
+
+        logger.info(f"Clickhouse database and table setup complete (schema version {schema_version})")
         return "ClickHouse setup successful"
 
     except Exception as e:
@@ -467,41 +812,37 @@ with DAG(
     catchup=False,
 ) as dag:
 
-    # Create ClickHouse table
-    create_clickhouse_table = PythonOperator(
-        task_id="create_clickhouse_table",
-        python_callable=setup_clickhouse,
-    )
-
-    # Determine date range based on first run status
+    # Set up the ClickHouse schema if it changed and determine the unseen
+    # date range from the watermark
     get_date_range_task = PythonOperator(
         task_id="get_date_range",
         python_callable=get_date_range,
     )
 
-    # Extract data from Total portal
-    extract_task = PythonOperator(
-        task_id="extract_total_data",
-        python_callable=extract_total_data,
-    )
-
-    # Load data to ClickHouse
-    load_clickhouse_task = PythonOperator(
-        task_id="load_to_clickhouse",
-        python_callable=load_to_clickhouse,
+    # Split the date range into day/week chunks
+    plan_chunks_task = PythonOperator(
+        task_id="plan_backfill_chunks",
+        python_callable=plan_backfill_chunks,
     )
 
-    # Record successful date for next run
-    record_date_task = PythonOperator(
-        task_id="record_successful_date",
-        python_callable=record_successful_date,
+    # Extract each chunk from the Total portal and load it to ClickHouse,
+    # at most BACKFILL_CONCURRENCY chunks at a time
+    extract_and_load_task = PythonOperator.partial(
+        task_id="extract_and_load",
+        python_callable=extract_and_load,
+        max_active_tis_per_dag=BACKFILL_CONCURRENCY,
+    ).expand(op_kwargs=plan_chunks_task.output)
+
+    # Advance the watermark for the next run
+    advance_watermark_task = PythonOperator(
+        task_id="advance_watermark",
+        python_callable=advance_watermark,
     )
 
     # Set task dependencies
     (
-        create_clickhouse_table
-        >> get_date_range_task
-        >> extract_task
-        >> load_clickhouse_task
-        >> record_date_task
+        get_date_range_task
+        >> plan_chunks_task
+        >> extract_and_load_task
+        >> advance_watermark_task
     )
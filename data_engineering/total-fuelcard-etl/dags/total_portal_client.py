@@ -0,0 +1,167 @@
+"""Direct HTTP client for the Total fuel card portal.
+
+Replays the portal's login form and transaction export requests with a
+pooled requests.Session and streams the CSV body to disk, so extraction does
+not need a headless browser. The endpoints are the ones the portal UI calls
+(captured from the browser's network tab) and are configured through the
+total_login_url / total_export_url Airflow Variables.
+
+RecordedPortalAdapter serves recorded responses instead of the live portal,
+for running the extract path offline.
+"""
+
+import io
+import logging
+import os
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Bytes written per chunk while streaming an export
+CHUNK_SIZE = 1024 * 1024
+
+
+class PortalError(Exception):
+    """The portal rejected the login or returned something other than a CSV export."""
+
+
+class TotalPortalClient:
+    """Logs in to the Total portal and downloads transaction exports over HTTP."""
+
+    def __init__(
+        self,
+        login_url,
+        export_url,
+        username,
+        password,
+        timeout=60,
+        pool_size=4,
+        retries=3,
+        session=None,
+    ):
+        """
+        Args:
+            login_url: URL the login form posts to
+            export_url: URL the transactions export button requests
+            username: Portal username
+            password: Portal password
+            timeout: Seconds to wait for the portal to respond
+            pool_size: Connections kept open per host
+            retries: Retries on connection errors and 5xx responses, with backoff
+            session: Pre-configured session (e.g. with a RecordedPortalAdapter mounted)
+        """
+        self.login_url = login_url
+        self.export_url = export_url
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+
+        if session is None:
+            session = requests.Session()
+            retry = Retry(
+                total=retries,
+                backoff_factor=1,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=None,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def login(self):
+        """Post the login form; the session keeps the authentication cookies."""
+        logger.info(f"Logging in to the Total portal as {self.username}")
+        response = self.session.post(
+            self.login_url,
+            data={"username": self.username, "password": self.password},
+            timeout=self.timeout,
+        )
+        if response.status_code in (401, 403):
+            raise PortalError(f"Login failed with HTTP {response.status_code}")
+        response.raise_for_status()
+
+    def export_transactions(self, begin, end, dest_path):
+        """Stream the transactions export for begin..end (dd/mm/YYYY) to dest_path.
+
+        The body is written in chunks to a temporary file that is renamed once
+        complete, so a reader never sees a partial export.
+        """
+        logger.info(f"Requesting transactions export {begin} to {end}")
+        partial_path = f"{dest_path}.part"
+        with self.session.get(
+            self.export_url,
+            params={"begin": begin, "end": end},
+            stream=True,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if "html" in content_type:
+                # An expired session or a bad request renders the portal page instead of the file
+                raise PortalError(f"Export returned {content_type} instead of a CSV file")
+
+            size = 0
+            try:
+                with open(partial_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        size += len(chunk)
+                os.replace(partial_path, dest_path)
+            except Exception:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+
+        logger.info(f"Downloaded {size} bytes to {dest_path}")
+        return dest_path
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordedPortalAdapter(BaseAdapter):
+    """Transport adapter answering portal requests from recorded responses.
+
+    routes maps a URL path to (status, content_type, body file); every
+    request is kept in `requests` for inspection. Mount it on a session and
+    pass that session to TotalPortalClient.
+    """
+
+    def __init__(self, routes):
+        super().__init__()
+        self.routes = routes
+        self.requests = []
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self.requests.append(request)
+        path = urlsplit(request.url).path
+        if path not in self.routes:
+            status, content_type, body_path = 404, "text/plain", None
+        else:
+            status, content_type, body_path = self.routes[path]
+
+        response = requests.Response()
+        response.status_code = status
+        response.url = request.url
+        response.request = request
+        response.headers["Content-Type"] = content_type
+        response.raw = open(body_path, "rb") if body_path else io.BytesIO()
+        response.encoding = None
+        return response
+
+    def close(self):
+        pass
+
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+AMT Export Benchmark
+
+Measures the full-export path (MySQL read -> Arrow -> Parquet -> S3) against
+local stand-ins, so changes to paging, batch size, codecs or pipelining can be
+compared without touching production:
+1. Seeds a SQLite file (or a local MySQL) with synthetic rows for the registry tables
+2. Exports each table to a local directory or a moto-mocked S3 bucket
+3. Runs every scenario (paging x batch size x codec x mode) in its own process
+4. Reports rows/s, MB/s, peak RSS and fetch/encode/upload seconds per scenario
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from config import load_registry  # noqa: E402
+from exporter import TableExporter, new_run_id  # noqa: E402
+from reader import fetch_record_batches  # noqa: E402
+from schema import load_arrow_schema, rows_to_typed_record_batch  # noqa: E402
+from standins import LocalStore, SQLitePool, seed_table  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(processName)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+BENCH_BUCKET = "amt-export-bench"
+
+
+def fetch_record_batches_offset(connection, table, schema):
+    """LIMIT/OFFSET paging as used by the original sync scripts, kept as the benchmark baseline."""
+    cursor = connection.cursor()
+    offset = 0
+    try:
+        while True:
+            cursor.execute(f"SELECT {table.select_list} FROM {table.source}{table.where_clause()} "
+                           f"ORDER BY {table.key_field} LIMIT %s OFFSET %s",
+                           (table.batch_size, offset))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            yield rows_to_typed_record_batch(rows, schema)
+            offset += len(rows)
+            if len(rows) < table.batch_size:
+                break
+    finally:
+        cursor.close()
+
+
+READERS = {
+    'keyset': fetch_record_batches,
+    'offset': fetch_record_batches_offset,
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+def open_pool(args):
+    if args.mysql:
+        from connections import create_mysql_pool
+        return create_mysql_pool(1)
+    return SQLitePool(args.db)
+
+
+def open_store(args, output_dir: str):
+    """Return (store, context) for the configured target; the context must stay open while exporting."""
+    if args.target == 'moto':
+        import boto3
+        from moto import mock_aws
+        from storage import S3Store
+
+        context = mock_aws()
+        context.start()
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BENCH_BUCKET)
+        return S3Store(client, BENCH_BUCKET), context
+    return LocalStore(output_dir), None
+
+
+def export_table(exporter: TableExporter, read) -> dict:
+    """export_full with a pluggable reader: write a snapshot, then publish it."""
+    run_id = new_run_id()
+    prefix = exporter.snapshots.prefix(run_id)
+    connection = exporter.mysql_pool.get_connection()
+    try:
+        schema = load_arrow_schema(connection, exporter.table)
+        stats = exporter.write_batches(
+            read(connection, exporter.table, schema),
+            schema,
+            lambda part: f"{prefix}/batch_{part}.parquet",
+            partition_prefix=prefix
+        )
+    finally:
+        connection.close()
+    exporter.publish_snapshot(run_id, 'full', stats['written'], schema)
+    return stats
+
+
+def run_scenario(args, scenario: dict, queue):
+    """Export every benchmarked table once under one scenario (runs in a child process)."""
+    logging.getLogger().setLevel(logging.WARNING)
+    tables = load_registry(args.registry)
+    pool = open_pool(args)
+    with tempfile.TemporaryDirectory(prefix='amt_bench_') as output_dir:
+        store, context = open_store(args, output_dir)
+        results = []
+        try:
+            for name in args.table:
+                table = replace(tables[name], batch_size=scenario['batch_size'], compression=scenario['codec'])
+                table.validate()
+                exporter = TableExporter(
+                    table, pool, store,
+                    pipelined=scenario['mode'] == 'pipelined',
+                    queue_depth=args.queue_depth,
+                    upload_workers=args.upload_workers
+                )
+                started = time.perf_counter()
+                stats = export_table(exporter, READERS[scenario['paging']])
+                elapsed = time.perf_counter() - started
+                results.append({
+                    **scenario,
+                    'table': name,
+                    'rows': stats['rows'],
+                    'files': stats['files'],
+                    'bytes': stats['bytes'],
+                    'seconds': elapsed,
+                    'rows_per_second': stats['rows'] / elapsed if elapsed else 0.0,
+                    'mb_per_second': stats['bytes'] / MB / elapsed if elapsed else 0.0,
+                    'fetch_seconds': stats.get('fetch_seconds', 0.0),
+                    'encode_seconds': stats.get('encode_seconds', 0.0),
+                    'upload_seconds': stats.get('upload_seconds', 0.0),
+                    'peak_rss_mb': peak_rss_mb(),
+                })
+        finally:
+            if context is not None:
+                context.stop()
+    queue.put(results)
+
+
+def seed(args):
+    tables = load_registry(args.registry)
+    if args.mysql:
+        from connections import MYSQL_CONFIG
+        if MYSQL_CONFIG['host'] not in ('localhost', '127.0.0.1', '::1'):
+            # Seeding drops and recreates the tables
+            raise SystemExit(f"Refusing to seed non-local MySQL host {MYSQL_CONFIG['host']}")
+    pool = open_pool(args)
+    connection = pool.get_connection()
+    try:
+        for name in args.table:
+            if tables[name].source_table:
+                logger.info(f"[{name}] Profile of {tables[name].source_table}; seed that table instead")
+                continue
+            started = time.perf_counter()
+            seed_table(connection, tables[name], args.rows, log=logger.info)
+            logger.info(f"[{name}] Seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        connection.close()
+
+
+def print_report(results):
+    header = (f"{'table':<20} {'paging':<7} {'batch':>6} {'codec':<7} {'mode':<9} {'rows':>9} {'secs':>7} "
+              f"{'rows/s':>9} {'MB/s':>7} {'MB':>7} {'rss MB':>7} {'fetch':>7} {'encode':>7} {'upload':>7}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['table']:<20} {r['paging']:<7} {r['batch_size']:>6} {r['codec']:<7} {r['mode']:<9} "
+              f"{r['rows']:>9} {r['seconds']:>7.1f} {r['rows_per_second']:>9.0f} {r['mb_per_second']:>7.1f} "
+              f"{r['bytes'] / MB:>7.1f} {r['peak_rss_mb']:>7.0f} {r['fetch_seconds']:>7.1f} "
+              f"{r['encode_seconds']:>7.1f} {r['upload_seconds']:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the AMT exporter against local MySQL/S3 stand-ins',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Seed 2M synthetic rows per table into bench.sqlite, then compare paging strategies
+  python bench_export.py --seed --rows 2000000
+  python bench_export.py --paging keyset offset
+
+  # Compare batch sizes and codecs, serial vs pipelined, against moto S3
+  python bench_export.py --batch-size 1000 5000 20000 --codec snappy zstd none --mode serial pipelined --target moto
+        """
+    )
+    parser.add_argument('--registry', help='Path to the table registry YAML')
+    parser.add_argument('--table', nargs='+', default=['accounts', 'customers'], help='Registry tables to benchmark')
+    parser.add_argument('--db', default='bench.sqlite', help='SQLite stand-in database file (default: bench.sqlite)')
+    parser.add_argument('--mysql', action='store_true',
+                        help='Use the local MySQL from MYSQL_AMT_DB_* instead of SQLite')
+    parser.add_argument('--seed', action='store_true', help='(Re)create and seed the tables, then exit')
+    parser.add_argument('--rows', type=int, default=1000000, help='Rows per table when seeding (default: 1000000)')
+    parser.add_argument('--target', choices=['local', 'moto'], default='local',
+                        help='Write to a temp directory or a moto-mocked S3 bucket (default: local)')
+    parser.add_argument('--paging', nargs='+', choices=sorted(READERS), default=['keyset'])
+    parser.add_argument('--batch-size', nargs='+', type=int, default=[5000])
+    parser.add_argument('--codec', nargs='+', default=['snappy'])
+    parser.add_argument('--mode', nargs='+', choices=['serial', 'pipelined'], default=['serial'])
+    parser.add_argument('--queue-depth', type=int, default=4)
+    parser.add_argument('--upload-workers', type=int, default=4)
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args)
+        return
+    if not args.mysql and not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist; run with --seed first")
+
+    # A fresh process per scenario keeps peak RSS and caches from leaking between runs
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for paging, batch_size, codec, mode in itertools.product(args.paging, args.batch_size, args.codec, args.mode):
+        scenario = {'paging': paging, 'batch_size': batch_size, 'codec': codec, 'mode': mode}
+        logger.info(f"Running {scenario}")
+        queue = context.Queue()
+        process = context.Process(target=run_scenario, args=(args, scenario, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            logger.error(f"Scenario {scenario} failed (exit code {process.exitcode})")
+            continue
+        results.extend(queue.get())
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""Local stand-ins for AMT MySQL and S3 used by the export benchmark.
+
+- SQLitePool mimics the mysql-connector pool/cursor API the exporter uses
+  (%s placeholders, information_schema lookups), backed by a SQLite file
+  whose column declarations are MySQL types.
+- LocalStore is an S3Store that writes objects under a local directory.
+- seed_table fills either database with synthetic rows for a registry table.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import TableConfig
+from storage import S3Store
+
+# Rows inserted per executemany when seeding
+SEED_CHUNK_SIZE = 50000
+
+# Synthetic rows are spread over this many days before SEED_EPOCH
+SEED_EPOCH = datetime(2025, 1, 1)
+SEED_SPAN_DAYS = 5 * 365
+
+CATEGORIES = {
+    'status': ['ACTIVE', 'INACTIVE', 'PENDING', 'DEFAULTED', 'COMPLETED', 'REPOSSESSED'],
+    'gender': ['MALE', 'FEMALE', None],
+    'referralOption': ['RADIO', 'FIELD_AGENT', 'REFERRAL', 'SOCIAL_MEDIA', 'OTHER', None],
+    'customerSource': ['SALESFORCE', 'AMT', 'USSD', 'WEB'],
+    'accountType': ['PAYG', 'CASH', 'LOAN'],
+}
+
+FIRST_NAMES = ['Wanjiru', 'Otieno', 'Achieng', 'Kamau', 'Mutua', 'Njeri', 'Kiprono', 'Akinyi', 'Mwangi', 'Chebet']
+LAST_NAMES = ['Kariuki', 'Odhiambo', 'Wafula', 'Mugo', 'Kiptoo', 'Nyambura', 'Omondi', 'Koech', 'Wekesa', 'Ndungu']
+INTERESTS = ['irrigation', 'lighting', 'water_pump', 'fodder', 'solar_tv', 'cold_storage']
+
+
+def mysql_column_type(field: str) -> str:
+    """MySQL column type of an AMT field, derived from its name."""
+    if field == 'id' or field.endswith('Id') or field in ('createdBy', 'updatedBy'):
+        return 'int unsigned'
+    if field.endswith('At') or field.endswith('Date'):
+        return 'datetime'
+    if field == 'creditCheck':
+        return 'tinyint(1)'
+    if field in ('salesAgents', 'interests'):
+        return 'json'
+    if field in CATEGORIES:
+        return 'varchar(32)'
+    return 'varchar(255)'
+
+
+def _random_datetime(rng: random.Random) -> datetime:
+    return SEED_EPOCH - timedelta(seconds=rng.randrange(SEED_SPAN_DAYS * 86400))
+
+
+def _value_generator(table_name: str, field: str) -> Callable[[random.Random, int], object]:
+    """Build f(rng, row_id) producing a plausible value for one column."""
+    column_type = mysql_column_type(field)
+    if field == 'id':
+        return lambda rng, row_id: row_id
+    if field == 'parentAccountId':
+        return lambda rng, row_id: rng.randrange(1, row_id) if row_id > 1 and rng.random() < 0.05 else None
+    if column_type.startswith('int'):
+        return lambda rng, row_id: rng.randrange(1, 50000) if rng.random() < 0.95 else None
+    if field == 'createdAt':
+        # Ids are assigned in insert order, so createdAt grows with the id (about one row a minute)
+        return lambda rng, row_id: SEED_EPOCH - timedelta(days=SEED_SPAN_DAYS) + timedelta(minutes=row_id,
+                                                                                           seconds=rng.randrange(60))
+    if field == 'updatedAt':
+        # Recent updates cluster near the epoch, as they do in production
+        return lambda rng, row_id: SEED_EPOCH - timedelta(seconds=int(rng.expovariate(1 / (30 * 86400))))
+    if column_type == 'datetime':
+        return lambda rng, row_id: _random_datetime(rng) if rng.random() < 0.8 else None
+    if column_type == 'tinyint(1)':
+        return lambda rng, row_id: rng.random() < 0.6
+    if field == 'salesAgents':
+        return lambda rng, row_id: json.dumps([{'id': rng.randrange(1, 2000), 'role': 'PRIMARY'}])
+    if field == 'interests':
+        return lambda rng, row_id: json.dumps(rng.sample(INTERESTS, rng.randrange(0, 4)))
+    if field in CATEGORIES:
+        choices = CATEGORIES[field]
+        return lambda rng, row_id: rng.choice(choices)
+    if field == 'name':
+        return lambda rng, row_id: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    if field == 'accountRef':
+        return lambda rng, row_id: f"SC{row_id:09d}"
+    return lambda rng, row_id: f"{table_name}-{field}-{rng.randrange(1000000)}"
+
+
+def synthetic_rows(table: TableConfig, start_id: int, count: int, seed: int = 42) -> List[tuple]:
+    """Rows for ids start_id..start_id+count-1, in registry field order. Deterministic per id range."""
+    rng = random.Random(f"{seed}-{table.name}-{start_id}")
+    generators = [_value_generator(table.name, field) for field in table.fields]
+    return [tuple(generate(rng, row_id) for generate in generators)
+            for row_id in range(start_id, start_id + count)]
+
+
+def _create_table_sql(table: TableConfig) -> str:
+    columns = ', '.join(f"`{field}` {mysql_column_type(field)}" for field in table.fields)
+    return f"CREATE TABLE `{table.name}` ({columns}, PRIMARY KEY (`{table.key_field}`))"
+
+
+def seed_table(connection, table: TableConfig, rows: int, log: Callable[[str], None] = print):
+    """(Re)create a table and fill it with `rows` synthetic rows."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS `{table.name}`")
+        cursor.execute(_create_table_sql(table))
+        if table.watermark_field:
+            cursor.execute(f"CREATE INDEX `idx_{table.name}_watermark` ON `{table.name}` "
+                           f"(`{table.watermark_field}`, `{table.key_field}`)")
+        insert = (f"INSERT INTO `{table.name}` ({', '.join(f'`{field}`' for field in table.fields)}) "
+                  f"VALUES ({', '.join(['%s'] * len(table.fields))})")
+        for start in range(1, rows + 1, SEED_CHUNK_SIZE):
+            cursor.executemany(insert, synthetic_rows(table, start, min(SEED_CHUNK_SIZE, rows - start + 1)))
+            connection.commit()
+            log(f"[{table.name}] Seeded {min(start + SEED_CHUNK_SIZE - 1, rows)}/{rows} rows")
+    finally:
+        cursor.close()
+
+
+# SQLite hands datetime columns back as datetime objects, like mysql-connector
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+sqlite3.register_converter('datetime', lambda value: datetime.fromisoformat(value.decode()))
+
+_INFORMATION_SCHEMA = re.compile(r'\bFROM\s+information_schema\.COLUMNS\b', re.IGNORECASE)
+
+
+def _sha2(value, bits):
+    return None if value is None else hashlib.new(f'sha{bits}', str(value).encode()).hexdigest()
+
+
+def _md5(value):
+    return None if value is None else hashlib.md5(str(value).encode()).hexdigest()
+
+
+class SQLiteCursor:
+    """mysql-connector style cursor over sqlite3: %s placeholders and information_schema.COLUMNS."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._cursor = connection.cursor()
+        self._rows: Optional[List[tuple]] = None
+
+    def execute(self, query: str, params=()):
+        self._rows = None
+        if _INFORMATION_SCHEMA.search(query):
+            # Only the (COLUMN_NAME, DATA_TYPE, COLUMN_TYPE) lookup of schema.load_arrow_schema is supported
+            table_name = params[0]
+            self._cursor.execute(f"PRAGMA table_info(`{table_name}`)")
+            self._rows = [(name, re.split(r'[\s(]', declared, 1)[0], declared)
+                          for _, name, declared, *_ in self._cursor.fetchall()]
+            return
+        self._cursor.execute(query.replace('%s', '?'), params)
+
+    def executemany(self, query: str, rows):
+        self._cursor.executemany(query.replace('%s', '?'), rows)
+
+    def fetchall(self) -> List[tuple]:
+        if self._rows is not None:
+            rows, self._rows = self._rows, None
+            return rows
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str):
+        # Pipelined exports read from the fetch thread, not the thread that opened the connection
+        self._connection = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        # MySQL functions used by profile transforms
+        self._connection.create_function('SHA2', 2, _sha2, deterministic=True)
+        self._connection.create_function('MD5', 1, _md5, deterministic=True)
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._connection)
+
+    def commit(self):
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLitePool:
+    """Stands in for mysql.connector.pooling.MySQLConnectionPool."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get_connection(self) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
+
+
+class LocalStore(S3Store):
+    """S3Store writing objects to files under a local directory, for I/O-only benchmarks."""
+
+    def __init__(self, root: str):
+        super().__init__(client=None, bucket=os.path.basename(os.path.abspath(root)))
+        self.root = Path(root)
+
+    def uri(self, key: str) -> str:
+        return str(self.root / key)
+
+    def _path(self, key: str) -> Path:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def upload_buffer(self, buffer: BytesIO, key: str):
+        buffer.seek(0)
+        with open(self._path(key), 'wb') as f:
+            shutil.copyfileobj(buffer, f)
+
+    def upload_file(self, path: str, key: str):
+        shutil.copyfile(path, self._path(key))
+
+    def copy(self, source_key: str, key: str):
+        shutil.copyfile(self.root / source_key, self._path(key))
+
+    def read_table(self, key: str) -> pa.Table:
+        return pq.read_table(self.root / key)
+
+    def list_keys(self, prefix: str) -> List[str]:
+        if not self.root.exists():
+            return []
+        keys = (path.relative_to(self.root).as_posix() for path in self.root.rglob('*') if path.is_file())
+        return sorted(key for key in keys if key.startswith(prefix))
+
+    def delete_keys(self, keys: List[str]):
+        for key in keys:
+            (self.root / key).unlink(missing_ok=True)
+
+    def get_json(self, key: str) -> Optional[Dict]:
+        path = self.root / key
+        if not path.exists():
+            return None
+        return json.loads(path.read_bytes())
+
+    def put_json(self, key: str, document: Dict):
+        self._path(key).write_text(json.dumps(document, indent=2, default=str))
+
+    def etag(self, key: str) -> Optional[str]:
+        path = self.root / key
+        if not path.exists():
+            return None
+        return f'"{hashlib.md5(path.read_bytes()).hexdigest()}"'
@@ -0,0 +1,169 @@
+"""Table registry for the AMT S3 exporter, loaded from YAML.
+
+Besides plain `tables`, the registry can declare `profiles`: derived exports
+of a table with a column projection, a row predicate and per-column
+transforms, all pushed down into the SELECT so unneeded columns and rows
+never leave MySQL.
+"""
+
+import os
+from dataclasses import dataclass, field, fields as dataclass_fields
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+# Repo root is five levels above this file: s3/data-sync/amt/exporter/v1/config.py
+DEFAULT_REGISTRY_PATH = Path(__file__).resolve().parents[5] / "data-products" / "yaml" / "accounts" / "v1" / "accounts.yml"
+
+PARTITION_GRANULARITIES = (None, 'year', 'month', 'day')
+
+# SQL applied to a column by a profile transform; every transform yields text
+COLUMN_TRANSFORMS = {
+    'sha256': "SHA2({column}, 256)",
+    'md5': "MD5({column})",
+}
+
+
+@dataclass
+class TableConfig:
+    """Export settings for a single table or profile."""
+    name: str
+    fields: List[str]
+    key_field: str = "id"
+    watermark_field: Optional[str] = None
+    batch_size: int = 5000
+    compression: str = "snappy"
+    target_file_size_mb: int = 128
+    row_group_size: int = 100000
+    partition_column: Optional[str] = None
+    partition_name: Optional[str] = None
+    partition_granularity: Optional[str] = None
+    max_open_partitions: int = 32
+    snapshot_retention: int = 3
+    checkpoint_rows: int = 1000000
+    # Profiles only: MySQL table read from (default: name), row predicate and {column: transform}
+    source_table: Optional[str] = None
+    where: Optional[str] = None
+    transforms: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def key_index(self) -> int:
+        return self.fields.index(self.key_field)
+
+    @property
+    def watermark_index(self) -> int:
+        return self.fields.index(self.watermark_field)
+
+    @property
+    def target_file_size(self) -> int:
+        return self.target_file_size_mb * 1024 * 1024
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self.partition_column is not None
+
+    @property
+    def partition_label(self) -> Optional[str]:
+        """Directory name of the partition, e.g. created_month in created_month=2025-03."""
+        if not self.is_partitioned:
+            return None
+        return self.partition_name or self.partition_column
+
+    @property
+    def supports_incremental(self) -> bool:
+        return self.watermark_field is not None
+
+    @property
+    def source(self) -> str:
+        """MySQL table the rows are read from."""
+        return self.source_table or self.name
+
+    @property
+    def select_list(self) -> str:
+        """SELECT expressions for the exported fields, with transforms applied."""
+        columns = []
+        for name in self.fields:
+            transform = self.transforms.get(name)
+            if transform:
+                columns.append(f"{COLUMN_TRANSFORMS[transform].format(column=name)} AS {name}")
+            else:
+                columns.append(name)
+        return ', '.join(columns)
+
+    def where_clause(self, *conditions: str) -> str:
+        """' WHERE ...' combining the profile predicate with the given conditions, or ''."""
+        predicates = [f"({condition})" for condition in (self.where, *conditions) if condition]
+        return f" WHERE {' AND '.join(predicates)}" if predicates else ""
+
+    def validate(self):
+        """Raise ValueError if the table entry is inconsistent."""
+        if not self.fields:
+            raise ValueError(f"Table '{self.name}' has no fields")
+        if self.key_field not in self.fields:
+            raise ValueError(f"Table '{self.name}': key_field '{self.key_field}' is not in fields")
+        if self.watermark_field and self.watermark_field not in self.fields:
+            raise ValueError(f"Table '{self.name}': watermark_field '{self.watermark_field}' is not in fields")
+        if self.partition_column and self.partition_column not in self.fields:
+            raise ValueError(f"Table '{self.name}': partition_column '{self.partition_column}' is not in fields")
+        if self.partition_granularity not in PARTITION_GRANULARITIES:
+            raise ValueError(f"Table '{self.name}': partition_granularity must be one of "
+                             f"{', '.join(g for g in PARTITION_GRANULARITIES if g)}")
+        for column, transform in self.transforms.items():
+            if column not in self.fields:
+                raise ValueError(f"Table '{self.name}': transformed column '{column}' is not in fields")
+            if transform not in COLUMN_TRANSFORMS:
+                raise ValueError(f"Table '{self.name}': unknown transform '{transform}' for '{column}', "
+                                 f"expected one of {', '.join(COLUMN_TRANSFORMS)}")
+            if column in (self.key_field, self.watermark_field, self.partition_column):
+                raise ValueError(f"Table '{self.name}': key, watermark and partition columns cannot be transformed")
+        for setting in ('batch_size', 'target_file_size_mb', 'row_group_size', 'max_open_partitions',
+                        'snapshot_retention', 'checkpoint_rows'):
+            if getattr(self, setting) <= 0:
+                raise ValueError(f"Table '{self.name}': {setting} must be positive")
+
+
+def load_registry(path: Optional[str] = None) -> Dict[str, TableConfig]:
+    """Load the table registry, applying `defaults` to every table entry.
+
+    A profile starts from the settings of the table it names in `table` and
+    overrides any of them (typically fields, where and transforms).
+    """
+    registry_path = Path(path or os.getenv("AMT_EXPORT_REGISTRY") or DEFAULT_REGISTRY_PATH)
+    with open(registry_path, "r") as f:
+        document = yaml.safe_load(f) or {}
+
+    defaults = document.get("defaults") or {}
+    tables = document.get("tables") or {}
+    if not tables:
+        raise ValueError(f"No tables defined in registry {registry_path}")
+
+    # source_table is set from a profile's `table` key, not written in the registry
+    known_keys = {f.name for f in dataclass_fields(TableConfig)} - {"name", "source_table"}
+
+    def check_keys(name: str, entry: Dict):
+        unknown = set(entry) - known_keys
+        if unknown:
+            raise ValueError(f"Table '{name}': unknown registry keys {sorted(unknown)}")
+
+    entries = {}
+    for name, entry in tables.items():
+        entries[name] = {**defaults, **(entry or {})}
+        check_keys(name, entries[name])
+
+    for name, entry in (document.get("profiles") or {}).items():
+        entry = dict(entry or {})
+        source = entry.pop("table", None)
+        if source not in tables:
+            raise ValueError(f"Profile '{name}': 'table' must name one of the registry tables")
+        if name in entries:
+            raise ValueError(f"Profile '{name}' has the same name as a table")
+        check_keys(name, entry)
+        entries[name] = {**entries[source], **entry, "source_table": source}
+
+    registry = {}
+    for name, merged in entries.items():
+        table = TableConfig(name=name, **merged)
+        table.validate()
+        registry[name] = table
+    return registry
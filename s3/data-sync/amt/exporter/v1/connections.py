@@ -0,0 +1,62 @@
+"""Shared MySQL connection pool and S3 client for the AMT exporter."""
+
+import os
+import logging
+
+import boto3
+import mysql.connector
+from mysql.connector import pooling
+from dotenv import load_dotenv
+
+# Load AWS credentials and config from .env
+load_dotenv()
+AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+AWS_REGION = os.getenv("AWS_REGION")
+S3_BUCKET = os.getenv("S3_DATA_WAREHOUSE_BUCKET")
+
+# MySQL connection config from .env
+MYSQL_CONFIG = {
+    'host': os.getenv("MYSQL_AMT_DB_HOST"),
+    'user': os.getenv("MYSQL_AMT_DB_USER"),
+    'password': os.getenv("MYSQL_AMT_DB_PASSWORD"),
+    'database': os.getenv("MYSQL_AMT_DB_NAME"),
+    'port': int(os.getenv("MYSQL_AMT_DB_PORT", 3306))
+}
+
+# mysql-connector caps a pool at 32 connections
+MAX_POOL_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+
+def create_mysql_pool(pool_size: int) -> pooling.MySQLConnectionPool:
+    """Create a MySQL connection pool shared by all table workers."""
+    try:
+        pool = pooling.MySQLConnectionPool(
+            pool_name="amt_export",
+            pool_size=max(1, min(pool_size, MAX_POOL_SIZE)),
+            **MYSQL_CONFIG
+        )
+        logger.info(f"MySQL connection pool ready ({pool.pool_size} connections)")
+        return pool
+    except mysql.connector.Error as e:
+        logger.error(f"Error connecting to MySQL: {e}")
+        raise
+
+
+def create_s3_client():
+    """Create the S3 client shared by all table workers (boto3 clients are thread-safe)."""
+    s3 = boto3.client(
+        's3',
+        region_name=AWS_REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+    try:
+        s3.head_bucket(Bucket=S3_BUCKET)
+        logger.info("S3 connection established successfully.")
+    except Exception as e:
+        logger.error(f"Error connecting to S3: {e}")
+        raise
+    return s3
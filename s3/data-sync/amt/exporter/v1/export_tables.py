@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+AMT -> S3 Data Warehouse Exporter
+
+Exports every table in the YAML registry (data-products/yaml/accounts/v1/accounts.yml)
+from the AMT MySQL database to S3 as Parquet, in one process:
+1. One MySQL connection pool and one S3 client shared by all tables
+2. Tables exported concurrently in a bounded worker pool
+3. Keyset pagination on the primary key (no OFFSET)
+4. Incremental (updatedAt, id) watermark mode with delta compaction
+5. Checkpoints every checkpoint_rows rows; --resume continues a failed full export
+"""
+
+import argparse
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from config import load_registry
+from connections import S3_BUCKET, create_mysql_pool, create_s3_client
+from exporter import TableExporter
+from storage import S3Store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+
+def export_tables(tables, mode: str, workers: int, pipelined: bool = False,
+                  queue_depth: int = 4, upload_workers: int = 4, resume: bool = False):
+    """Export the given tables concurrently, returning {table: summary or exception}."""
+    workers = max(1, min(workers, len(tables)))
+    mysql_pool = create_mysql_pool(workers)
+    store = S3Store(create_s3_client(), S3_BUCKET)
+    exporter_options = {'pipelined': pipelined, 'queue_depth': queue_depth, 'upload_workers': upload_workers}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as executor:
+        futures = {
+            executor.submit(TableExporter(table, mysql_pool, store, **exporter_options).run, mode, resume): table.name
+            for table in tables
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"[{name}] Export failed: {e}", exc_info=True)
+                results[name] = e
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export AMT tables from MySQL to the S3 data warehouse in Parquet format',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Full export of every table in the registry
+  python %(prog)s
+
+  # Nightly incremental export of two tables
+  python %(prog)s --mode incremental --table accounts --table customers
+
+  # Overlap MySQL reads, Parquet encoding and S3 uploads
+  python %(prog)s --pipelined --upload-workers 8
+
+  # Continue a full export that failed, from its last checkpoint
+  python %(prog)s --table accounts --resume
+
+  # Merge pending deltas into the current snapshot
+  python %(prog)s --mode compact --table accounts
+        """
+    )
+    parser.add_argument('--registry',
+                        help='Path to the YAML table registry (default: data-products/yaml/accounts/v1/accounts.yml)')
+    parser.add_argument('--table', action='append', dest='tables',
+                        help='Table to export (repeatable, default: all tables in the registry)')
+    parser.add_argument('--mode', choices=['full', 'incremental', 'compact'], default='full',
+                        help='full: re-export whole tables; incremental: export rows changed since the '
+                             'last watermark; compact: merge pending deltas into the snapshot (default: full)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of tables exported concurrently (default: 4)')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Run fetch, encode and upload as concurrent stages joined by bounded queues')
+    parser.add_argument('--queue-depth', type=int, default=4,
+                        help='Max batches buffered between pipeline stages (default: 4)')
+    parser.add_argument('--upload-workers', type=int, default=4,
+                        help='Concurrent uploads per table in pipelined mode (default: 4)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the last failed full export of each table from its checkpoint')
+    args = parser.parse_args()
+
+    registry = load_registry(args.registry)
+    names = args.tables or list(registry)
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        parser.error(f"Unknown table(s): {', '.join(unknown)}. Registry has: {', '.join(registry)}")
+    tables = [registry[name] for name in names]
+    if args.mode != 'full':
+        skipped = [t.name for t in tables if not t.supports_incremental]
+        if skipped:
+            logger.info(f"Skipping tables without a watermark_field in {args.mode} mode: {', '.join(skipped)}")
+        tables = [t for t in tables if t.supports_incremental]
+        if not tables:
+            logger.info("Nothing to export.")
+            return
+
+    start_time = datetime.now()
+    logger.info(f"Exporting {len(tables)} table(s) in {args.mode} mode with {args.workers} worker(s)")
+    results = export_tables(tables, args.mode, args.workers, pipelined=args.pipelined,
+                            queue_depth=args.queue_depth, upload_workers=args.upload_workers,
+                            resume=args.resume)
+
+    failed = [name for name, result in results.items() if isinstance(result, Exception)]
+    for name, result in results.items():
+        if not isinstance(result, Exception):
+            logger.info(f"[{name}] {result['rows']} rows, {result['files']} files")
+    logger.info(f"Finished in {(datetime.now() - start_time).total_seconds():.1f}s")
+    if failed:
+        logger.error(f"Failed tables: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""Per-table export logic: full snapshot, incremental deltas and compaction."""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config import TableConfig
+from manifest import build_manifest
+from pipeline import ExportPipeline
+from reader import fetch_changed_record_batches, fetch_record_batches
+from schema import load_arrow_schema
+from snapshots import SnapshotPublisher
+from storage import S3Store
+from writer import PartitionedWriter, RollingParquetWriter, WrittenFile
+
+logger = logging.getLogger(__name__)
+
+
+def new_run_id(started: Optional[datetime] = None) -> str:
+    """Chronologically sortable id for one export run, e.g. 20250301T020000-123456."""
+    return (started or datetime.now()).strftime('%Y%m%dT%H%M%S-%f')
+
+
+def batch_number_of(key: str) -> int:
+    """Extract N from a '<table>/batch_N.parquet' key."""
+    return int(key.rsplit('batch_', 1)[1].split('.')[0])
+
+
+class TableExporter:
+    """Exports one registry table from MySQL to S3."""
+
+    def __init__(self, table: TableConfig, mysql_pool, store: S3Store,
+                 pipelined: bool = False, queue_depth: int = 4, upload_workers: int = 4):
+        """
+        Args:
+            table: Registry entry for the table to export
+            mysql_pool: Shared MySQL connection pool
+            store: Shared S3 store
+            pipelined: If True, overlap fetch, encode and upload in separate threads
+            queue_depth: Max batches buffered between pipeline stages
+            upload_workers: Concurrent uploads in pipelined mode
+        """
+        self.table = table
+        self.mysql_pool = mysql_pool
+        self.store = store
+        self.pipelined = pipelined
+        self.queue_depth = queue_depth
+        self.upload_workers = upload_workers
+        self.state_key = f"{table.name}/_state/watermark.json"
+        self.checkpoint_key = f"{table.name}/_state/checkpoint.json"
+        self.delta_prefix = f"{table.name}/_deltas"
+        self.snapshots = SnapshotPublisher(store, table.name, table.snapshot_retention)
+
+    def _log(self, message: str):
+        logger.info(f"[{self.table.name}] {message}")
+
+    def run(self, mode: str, resume: bool = False) -> Dict:
+        """Run the export in the given mode and return a summary.
+
+        With resume, a full export continues the run recorded in the checkpoint
+        instead of starting a new snapshot.
+        """
+        if mode in ('incremental', 'compact') and not self.table.supports_incremental:
+            raise ValueError(f"Table '{self.table.name}' has no watermark_field; only full mode is supported")
+        if mode == 'incremental':
+            return self.export_incremental()
+        if mode == 'compact':
+            return self.compact()
+        return self.export_full(resume=resume)
+
+    def _writer_factory(self, schema: pa.Schema, key_for_part: Callable[[int], str],
+                        partition_prefix: Optional[str] = None, file_prefix: str = "part"):
+        """Build writers for one output; partitioned tables route rows under partition_prefix."""
+        writer_options = {
+            'compression': self.table.compression,
+            'target_file_size': self.table.target_file_size,
+            'row_group_size': self.table.row_group_size,
+        }
+
+        def build(on_file: Callable[[WrittenFile], None]):
+            if partition_prefix is not None and self.table.is_partitioned:
+                return PartitionedWriter(
+                    schema,
+                    partition_prefix,
+                    self.table.partition_column,
+                    self.table.partition_label,
+                    on_file,
+                    granularity=self.table.partition_granularity,
+                    max_open_partitions=self.table.max_open_partitions,
+                    file_prefix=file_prefix,
+                    **writer_options
+                )
+            return RollingParquetWriter(schema, key_for_part, on_file, **writer_options)
+        return build
+
+    def write_batches(self, batches: Iterator[pa.RecordBatch], schema: pa.Schema,
+                      key_for_part: Callable[[int], str], partition_prefix: Optional[str] = None,
+                      file_prefix: str = "part",
+                      on_checkpoint: Optional[Callable[[pa.RecordBatch, List[Dict]], None]] = None) -> Dict:
+        """Write record batches into size-rolled Parquet files and upload them.
+
+        With on_checkpoint, every checkpoint_rows rows the open files are
+        closed and uploaded, then on_checkpoint(last_batch, written) is called.
+
+        Returns row/file/byte counts, seconds spent fetching, encoding and
+        uploading, and `written`, the manifest entries of every uploaded file.
+        """
+        writer_factory = self._writer_factory(schema, key_for_part, partition_prefix, file_prefix)
+        if self.pipelined:
+            pipeline = ExportPipeline(
+                self.store,
+                writer_factory,
+                queue_depth=self.queue_depth,
+                upload_workers=self.upload_workers,
+                label=self.table.name
+            )
+            return pipeline.run(batches, self.table.checkpoint_rows, on_checkpoint)
+
+        stats = {'rows': 0, 'files': 0, 'bytes': 0, 'written': [],
+                 'fetch_seconds': 0.0, 'encode_seconds': 0.0, 'upload_seconds': 0.0}
+
+        def upload(written: WrittenFile):
+            started = time.perf_counter()
+            try:
+                self.store.upload_file(written.path, written.key)
+            finally:
+                os.remove(written.path)
+                stats['upload_seconds'] += time.perf_counter() - started
+            self._log(f"Uploaded {written.rows} rows ({written.size / 1024 / 1024:.1f} MB) "
+                      f"to {self.store.uri(written.key)}")
+            stats['files'] += 1
+            stats['bytes'] += written.size
+            stats['written'].append(written.manifest_entry())
+
+        writer = writer_factory(upload)
+        batches = iter(batches)
+        rows_since_checkpoint = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                record_batch = next(batches, None)
+                stats['fetch_seconds'] += time.perf_counter() - started
+                if record_batch is None:
+                    break
+                # Uploads of files closed by the writer run inline; their time is booked to upload
+                uploaded_before = stats['upload_seconds']
+                started = time.perf_counter()
+                writer.write(record_batch)
+                stats['encode_seconds'] += time.perf_counter() - started - (stats['upload_seconds'] - uploaded_before)
+                stats['rows'] += record_batch.num_rows
+                rows_since_checkpoint += record_batch.num_rows
+                if on_checkpoint and rows_since_checkpoint >= self.table.checkpoint_rows:
+                    # Uploads are inline, so every row up to this batch is in S3 once close returns
+                    writer.close()
+                    on_checkpoint(record_batch, list(stats['written']))
+                    rows_since_checkpoint = 0
+            uploaded_before = stats['upload_seconds']
+            started = time.perf_counter()
+            writer.close()
+            stats['encode_seconds'] += time.perf_counter() - started - (stats['upload_seconds'] - uploaded_before)
+        except Exception:
+            writer.abort()
+            raise
+        finally:
+            # Release the reader's cursor before the caller closes its connection
+            if hasattr(batches, 'close'):
+                batches.close()
+        return stats
+
+    def load_manifest(self) -> Optional[Dict]:
+        """Manifest of the currently published snapshot, if any."""
+        current = self.snapshots.current()
+        if current is None:
+            return None
+        return self.store.get_json(current['manifest'])
+
+    def save_manifest(self, run_id: str, mode: str, entries: List[Dict], schema: pa.Schema) -> Dict:
+        manifest_key = self.snapshots.manifest_key(run_id)
+        manifest = build_manifest(self.table.name, run_id, mode, entries,
+                                  partition_name=self.table.partition_label, schema=schema)
+        self.store.put_json(manifest_key, manifest)
+        self._log(f"Wrote manifest ({len(entries)} files, {manifest['total_rows']} rows) "
+                  f"to {self.store.uri(manifest_key)}")
+        return manifest
+
+    def publish_snapshot(self, run_id: str, mode: str, entries: List[Dict], schema: pa.Schema):
+        """Write the snapshot manifest, flip _CURRENT to it and expire old snapshots."""
+        manifest = self.save_manifest(run_id, mode, entries, schema)
+        self.snapshots.publish(run_id, manifest['total_rows'], len(entries))
+        self.snapshots.cleanup()
+
+    def load_checkpoint(self) -> Optional[Dict]:
+        return self.store.get_json(self.checkpoint_key)
+
+    def save_checkpoint(self, run_id: str, attempt: int, last_key, rows: int, files: List[Dict]):
+        """Record progress of a full export: the last exported key and every uploaded object with its ETag."""
+        self.store.put_json(self.checkpoint_key, {
+            'table': self.table.name,
+            'mode': 'full',
+            'run_id': run_id,
+            'attempt': attempt,
+            'fields': self.table.fields,
+            'last_key': last_key,
+            'rows': rows,
+            'files': files,
+            'timestamp': datetime.now().isoformat()
+        })
+        self._log(f"Checkpoint saved: {self.table.key_field}={last_key}, {len(files)} files, {rows} rows")
+
+    def clear_checkpoint(self):
+        self.store.delete_keys([self.checkpoint_key])
+
+    def resumable_checkpoint(self) -> Optional[Dict]:
+        """The checkpoint of an unfinished full export whose uploaded objects are all intact, if any."""
+        checkpoint = self.load_checkpoint()
+        if checkpoint is None:
+            self._log("[RESUME] No checkpoint found, starting a new export.")
+            return None
+        current = self.snapshots.current()
+        if current is not None and current['run_id'] >= checkpoint['run_id']:
+            self._log(f"[RESUME] Checkpoint of run {checkpoint['run_id']} is older than the published snapshot, "
+                      f"starting a new export.")
+            return None
+        if checkpoint['fields'] != self.table.fields:
+            self._log("[RESUME] Registry fields changed since the checkpoint, starting a new export.")
+            return None
+        for entry in checkpoint['files']:
+            if self.store.etag(entry['key']) != entry['etag']:
+                self._log(f"[RESUME] {entry['key']} is missing or was modified, starting a new export.")
+                return None
+        self._log(f"[RESUME] Resuming run {checkpoint['run_id']} after {self.table.key_field}="
+                  f"{checkpoint['last_key']} ({checkpoint['rows']} rows, {len(checkpoint['files'])} files)")
+        return checkpoint
+
+    def export_full(self, resume: bool = False) -> Dict:
+        """Re-export the whole table as a new snapshot.
+
+        Files go to <table>/_snapshots/<run_id>/, as batch_N.parquet or, for
+        partitioned tables, <partition>=<value>/part-NNNNN.parquet. _CURRENT is
+        flipped to the new snapshot only after every file has been uploaded,
+        so a failed or in-progress run never changes what readers see.
+
+        Every checkpoint_rows rows the open files are uploaded and the last
+        key is checkpointed; with resume, the run continues from there, keeping
+        the files uploaded before the failure.
+        """
+        started = time.perf_counter()
+        checkpoint = self.resumable_checkpoint() if resume else None
+        if checkpoint is None:
+            run_id, attempt, last_key, done_rows, done_files = new_run_id(), 0, None, 0, []
+        else:
+            run_id, attempt = checkpoint['run_id'], checkpoint['attempt'] + 1
+            last_key, done_rows, done_files = checkpoint['last_key'], checkpoint['rows'], checkpoint['files']
+        prefix = self.snapshots.prefix(run_id)
+
+        if checkpoint is not None:
+            # Files uploaded after the last checkpoint are re-exported, so drop them
+            kept = {entry['key'] for entry in done_files}
+            orphans = [key for key in self.store.list_keys(f"{prefix}/") if key not in kept]
+            self.store.delete_keys(orphans)
+
+        # Resumed attempts must not overwrite the files kept from earlier attempts
+        last_batch = max((batch_number_of(entry['key']) for entry in done_files if '/batch_' in entry['key']),
+                         default=0)
+        file_prefix = "part" if attempt == 0 else f"part-r{attempt}"
+        etags = {entry['key']: entry['etag'] for entry in done_files}
+
+        def checkpoint_progress(record_batch: pa.RecordBatch, written: List[Dict]):
+            for entry in written:
+                if entry['key'] not in etags:
+                    etags[entry['key']] = self.store.etag(entry['key'])
+            key_column = record_batch.column(record_batch.schema.get_field_index(self.table.key_field))
+            self.save_checkpoint(
+                run_id, attempt, key_column[-1].as_py(),
+                done_rows + sum(entry['rows'] for entry in written),
+                done_files + [{**entry, 'etag': etags[entry['key']]} for entry in written]
+            )
+
+        connection = self.mysql_pool.get_connection()
+        try:
+            schema = load_arrow_schema(connection, self.table)
+            stats = self.write_batches(
+                fetch_record_batches(connection, self.table, schema, after=last_key),
+                schema,
+                lambda part: f"{prefix}/batch_{last_batch + part}.parquet",
+                partition_prefix=prefix,
+                file_prefix=file_prefix,
+                on_checkpoint=checkpoint_progress
+            )
+        finally:
+            connection.close()
+
+        entries = [{k: v for k, v in entry.items() if k != 'etag'} for entry in done_files] + stats['written']
+        self.publish_snapshot(run_id, 'full', entries, schema)
+        self.clear_checkpoint()
+
+        total_rows = done_rows + stats['rows']
+        if total_rows == 0:
+            self._log("No data found to sync.")
+        else:
+            elapsed = time.perf_counter() - started
+            resumed = f", plus {done_rows} rows from earlier attempts" if done_rows else ""
+            self._log(f"Sync completed successfully ({stats['rows']} rows in {elapsed:.1f}s{resumed}).")
+        return stats
+
+    def load_watermark(self) -> Optional[Tuple]:
+        """Load the (updatedAt, id) high-water mark from the S3 state object."""
+        state = self.store.get_json(self.state_key)
+        if state is None:
+            return None
+        return datetime.fromisoformat(state['updated_at']), state['id']
+
+    def save_watermark(self, watermark: Tuple, rows_exported: int):
+        updated_at, last_id = watermark
+        self.store.put_json(self.state_key, {
+            'table': self.table.name,
+            'updated_at': updated_at.isoformat(),
+            'id': last_id,
+            'rows_exported': rows_exported,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def export_incremental(self) -> Dict:
+        """Export only rows changed since the last run into date-partitioned deltas.
+
+        The watermark is advanced only once the delta files holding the rows
+        up to it are uploaded: at every checkpoint and at the end of the run.
+        A failed run is simply repeated from the last advanced watermark.
+        """
+        watermark = self.load_watermark()
+        if watermark is None:
+            self._log("No watermark found, exporting all rows as the initial delta.")
+        else:
+            self._log(f"Exporting rows changed after {self.table.watermark_field}={watermark[0]}, "
+                      f"{self.table.key_field}={watermark[1]}")
+
+        run_started = datetime.now()
+        partition = f"{self.delta_prefix}/dt={run_started.strftime('%Y-%m-%d')}"
+        run_id = new_run_id(run_started)
+
+        # Watermark of the last row handed to the writer
+        last_seen = {'watermark': watermark}
+
+        def batches(schema):
+            for record_batch, batch_watermark in fetch_changed_record_batches(connection, self.table,
+                                                                              schema, watermark):
+                last_seen['watermark'] = batch_watermark
+                yield record_batch
+
+        manifest_key = f"{partition}/_manifest_{run_id}.json"
+
+        def checkpoint_progress(record_batch: pa.RecordBatch, written: List[Dict]):
+            self.store.put_json(manifest_key, build_manifest(self.table.name, run_id, 'incremental',
+                                                             written, schema=schema))
+            columns = record_batch.schema
+            checkpoint_watermark = (
+                record_batch.column(columns.get_field_index(self.table.watermark_field))[-1].as_py(),
+                record_batch.column(columns.get_field_index(self.table.key_field))[-1].as_py()
+            )
+            self.save_watermark(checkpoint_watermark, sum(entry['rows'] for entry in written))
+            self._log(f"Checkpoint: watermark now {self.table.watermark_field}={checkpoint_watermark[0]}, "
+                      f"{self.table.key_field}={checkpoint_watermark[1]}")
+
+        connection = self.mysql_pool.get_connection()
+        try:
+            schema = load_arrow_schema(connection, self.table)
+            stats = self.write_batches(
+                batches(schema),
+                schema,
+                lambda part: f"{partition}/part_{run_id}_{part}.parquet",
+                on_checkpoint=checkpoint_progress
+            )
+        finally:
+            connection.close()
+
+        if stats['rows'] == 0:
+            self._log("No changed rows found to sync.")
+        else:
+            self.store.put_json(manifest_key, build_manifest(self.table.name, run_id, 'incremental',
+                                                             stats['written'], schema=schema))
+            new_watermark = last_seen['watermark']
+            self.save_watermark(new_watermark, stats['rows'])
+            self._log(f"Incremental sync completed: {stats['rows']} rows, watermark now "
+                      f"{self.table.watermark_field}={new_watermark[0]}, {self.table.key_field}={new_watermark[1]}")
+        return stats
+
+    def latest_row_per_key(self, table: pa.Table) -> pa.Table:
+        """Keep only the most recently updated row for every primary key."""
+        key_field = self.table.key_field
+        table = table.sort_by([(key_field, 'ascending'), (self.table.watermark_field, 'descending')])
+        keys = table.column(key_field).to_numpy()
+        keep = np.ones(len(keys), dtype=bool)
+        keep[1:] = keys[1:] != keys[:-1]
+        return table.filter(pa.array(keep))
+
+    def _rewrite_file(self, table: pa.Table, key: str, partition: Dict) -> Dict:
+        """Re-encode a table over an existing snapshot key, returning its manifest entry."""
+        written = []
+
+        def upload(written_file: WrittenFile):
+            try:
+                self.store.upload_file(written_file.path, written_file.key)
+            finally:
+                os.remove(written_file.path)
+            written.append(written_file.manifest_entry())
+
+        # The rewritten file is never larger than the original, so it must not roll
+        writer = RollingParquetWriter(
+            table.schema, lambda part: key, upload,
+            compression=self.table.compression,
+            target_file_size=float('inf'),
+            row_group_size=self.table.row_group_size,
+            partition=partition
+        )
+        try:
+            for record_batch in table.to_batches():
+                writer.write(record_batch)
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+        return written[0]
+
+    def _copy_unchanged(self, entries: List[Dict], base: str, prefix: str) -> List[Dict]:
+        """Server-side copy untouched files into the new snapshot, returning their new entries."""
+        def copy(entry: Dict) -> Dict:
+            key = f"{prefix}/{entry['key'][len(base) + 1:]}"
+            self.store.copy(entry['key'], key)
+            return {**entry, 'key': key}
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            return list(executor.map(copy, entries))
+
+    def compact(self) -> Dict:
+        """Merge pending delta files into a new snapshot.
+
+        Files whose manifest key range cannot contain a changed row are copied
+        into the new snapshot server-side without being read. Changed rows are
+        dropped from the files that hold them and the latest version of every
+        changed or new row is written as new files, so rows whose partition
+        value changed move partitions. _CURRENT is flipped once the new
+        snapshot is complete; the deltas are deleted afterwards.
+        """
+        key_field = self.table.key_field
+        run_id = new_run_id()
+        prefix = self.snapshots.prefix(run_id)
+        delta_objects = self.store.list_keys(f"{self.delta_prefix}/")
+        delta_keys = sorted(key for key in delta_objects if key.endswith('.parquet'))
+        if not delta_keys:
+            self._log("No deltas found to compact.")
+            return {'rows': 0, 'files': 0}
+
+        deltas = pa.concat_tables([self.store.read_table(key) for key in delta_keys], promote_options='default')
+        pending = self.latest_row_per_key(deltas)
+        pending_ids = pending.column(key_field)
+        self._log(f"Compacting {len(delta_keys)} delta files ({pending.num_rows} distinct rows) into snapshot {run_id}")
+
+        current = self.snapshots.current()
+        manifest = self.load_manifest()
+        if manifest is not None:
+            base, entries = current['prefix'], manifest['files']
+        else:
+            # First compaction after the in-place layout: start from the legacy files
+            base, entries = self.table.name, [{'key': key} for key in self.snapshots.legacy_keys()]
+
+        unchanged, rewritten, files_written = [], [], 0
+        for entry in entries:
+            key_stats = entry.get('columns', {}).get(key_field, {})
+            low, high = key_stats.get('min'), key_stats.get('max')
+            if low is not None and high is not None:
+                in_range = pc.and_(pc.greater_equal(pending_ids, low), pc.less_equal(pending_ids, high))
+                if not pc.any(in_range).as_py():
+                    unchanged.append(entry)
+                    continue
+
+            snapshot_file = self.store.read_table(entry['key'])
+            changed = pc.is_in(snapshot_file.column(key_field), value_set=pending_ids)
+            if not pc.any(changed).as_py():
+                unchanged.append(entry)
+                continue
+
+            # A delta can be older than the snapshot row after a full re-export,
+            # so keep whichever version carries the latest updatedAt
+            pending = self.latest_row_per_key(
+                pa.concat_tables([pending, snapshot_file.filter(changed)], promote_options='default')
+            )
+            remaining = snapshot_file.filter(pc.invert(changed))
+            if remaining.num_rows:
+                key = f"{prefix}/{entry['key'][len(base) + 1:]}"
+                rewritten.append(self._rewrite_file(remaining, key, entry.get('partition', {})))
+                self._log(f"Rewrote {entry['key'][len(base) + 1:]} without "
+                          f"{snapshot_file.num_rows - remaining.num_rows} changed rows")
+            files_written += 1
+
+        kept = self._copy_unchanged(unchanged, base, prefix) + rewritten
+
+        # Write the latest version of every changed or new row as new files
+        batch_numbers = [batch_number_of(entry['key']) for entry in kept if '/batch_' in entry['key']]
+        last_batch = max(batch_numbers, default=0)
+        pending = pending.sort_by(key_field)
+        stats = self.write_batches(
+            iter(pending.to_batches()),
+            pending.schema,
+            lambda part: f"{prefix}/batch_{last_batch + part}.parquet",
+            partition_prefix=prefix,
+            file_prefix=f"part-c{run_id}"
+        )
+        files_written += stats['files']
+
+        self.publish_snapshot(run_id, 'compact', kept + stats['written'], pending.schema)
+        self.store.delete_keys(delta_objects)
+        self._log("Compaction completed successfully.")
+        return {'rows': deltas.num_rows, 'files': files_written}
@@ -0,0 +1,92 @@
+"""Per-file statistics and JSON manifests for the AMT exporter.
+
+Every uploaded file is described by its partition values, row count, size,
+SHA-256 checksum and per-column min/max/null counts taken from the Parquet
+footer. A manifest lists these entries so readers can prune partitions and
+skip files from the stats alone, without opening them.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, List
+
+import pyarrow.parquet as pq
+
+MANIFEST_VERSION = 1
+
+# Read files in 8 MB chunks when computing checksums
+_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def column_stats(path: str) -> Dict[str, Dict]:
+    """Aggregate min/max/null_count per column across all row groups.
+
+    min/max are left as None when any non-empty row group has no statistics
+    for the column, so a reader never skips a file on incomplete stats.
+    """
+    metadata = pq.ParquetFile(path).metadata
+    stats = {}
+    unknown = set()
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for col in range(row_group.num_columns):
+            chunk = row_group.column(col)
+            name = chunk.path_in_schema
+            entry = stats.setdefault(name, {'min': None, 'max': None, 'null_count': 0})
+            statistics = chunk.statistics
+            if statistics is not None and statistics.has_null_count:
+                entry['null_count'] += statistics.null_count
+                if statistics.null_count == row_group.num_rows:
+                    continue
+            if statistics is None or not statistics.has_min_max:
+                unknown.add(name)
+                continue
+            if entry['min'] is None or statistics.min < entry['min']:
+                entry['min'] = statistics.min
+            if entry['max'] is None or statistics.max > entry['max']:
+                entry['max'] = statistics.max
+    for name in unknown:
+        stats[name]['min'] = stats[name]['max'] = None
+    return stats
+
+
+def describe_file(path: str) -> Dict:
+    """Checksum and column statistics for a closed local Parquet file."""
+    return {
+        'sha256': file_checksum(path),
+        'columns': column_stats(path),
+    }
+
+
+def build_manifest(table_name: str, run_id: str, mode: str, files: List[Dict],
+                   partition_name: str = None, schema=None) -> Dict:
+    """Assemble a manifest document from file entries."""
+    partitions = {}
+    if partition_name:
+        for entry in files:
+            value = entry.get('partition', {}).get(partition_name)
+            summary = partitions.setdefault(value, {'files': 0, 'rows': 0})
+            summary['files'] += 1
+            summary['rows'] += entry.get('rows', 0)
+
+    return {
+        'version': MANIFEST_VERSION,
+        'table': table_name,
+        'run_id': run_id,
+        'mode': mode,
+        'created_at': datetime.now().isoformat(),
+        'schema': {field.name: str(field.type) for field in schema} if schema is not None else None,
+        'partition_by': partition_name,
+        'partitions': partitions,
+        'total_rows': sum(entry.get('rows', 0) for entry in files),
+        'total_bytes': sum(entry.get('size', 0) for entry in files),
+        'files': sorted(files, key=lambda entry: entry['key']),
+    }
@@ -0,0 +1,224 @@
+"""Bounded fetch -> encode -> upload pipeline for the AMT exporter.
+
+Each stage runs in its own thread(s) and hands work to the next through a
+bounded queue, so MySQL reads, Parquet encoding and S3 uploads overlap and
+throughput is set by the slowest stage instead of the sum of all three.
+The queue depths cap how many fetched batches and closed-but-not-uploaded
+files are held at once.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+import pyarrow as pa
+
+from storage import S3Store
+from writer import RollingParquetWriter, WrittenFile
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# How often blocked stages re-check whether another stage has failed
+_POLL_SECONDS = 0.5
+
+
+class ExportPipeline:
+    """Runs record batches through fetch, Parquet write and upload stages."""
+
+    def __init__(self, store: S3Store, writer_factory: Callable[[Callable], RollingParquetWriter],
+                 queue_depth: int = 4, upload_workers: int = 4, label: str = ""):
+        """
+        Args:
+            store: S3 store the closed files are uploaded to
+            writer_factory: Builds a RollingParquetWriter given its on_file callback
+            queue_depth: Max items buffered between stages
+            upload_workers: Number of concurrent upload threads
+            label: Prefix for log lines and thread names
+        """
+        self.store = store
+        self.writer_factory = writer_factory
+        self.queue_depth = max(1, queue_depth)
+        self.upload_workers = max(1, upload_workers)
+        self.label = label
+        self._stop = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+        self._uploaded = threading.Condition(self._lock)
+        self._handed_over = 0
+        self.stats = {}
+
+    def _log(self, message: str):
+        logger.info(f"[{self.label}] {message}" if self.label else message)
+
+    def _add_stat(self, name: str, value):
+        with self._lock:
+            self.stats[name] += value
+
+    def _fail(self, error: Exception):
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Put with back-pressure; gives up if another stage has failed."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Get the next item, or _DONE if another stage has failed."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fetch_stage(self, items: Iterator[pa.RecordBatch], encode_queue: queue.Queue):
+        try:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                finally:
+                    self._add_stat('fetch_seconds', time.perf_counter() - started)
+                if not self._put(encode_queue, item):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            # Closing the generator releases its cursor and connection
+            if hasattr(items, 'close'):
+                items.close()
+            self._put(encode_queue, _DONE)
+
+    def _wait_for_uploads(self) -> bool:
+        """Block until every handed-over file is uploaded; False if a stage failed meanwhile."""
+        with self._uploaded:
+            while self.stats['files'] < self._handed_over:
+                if self._stop.is_set():
+                    return False
+                self._uploaded.wait(timeout=_POLL_SECONDS)
+        return not self._stop.is_set()
+
+    def _encode_stage(self, encode_queue: queue.Queue, upload_queue: queue.Queue,
+                      checkpoint_rows: Optional[int], on_checkpoint: Optional[Callable]):
+        def hand_over(written: WrittenFile):
+            if self._put(upload_queue, written):
+                with self._lock:
+                    self._handed_over += 1
+            else:
+                os.remove(written.path)
+
+        writer = self.writer_factory(hand_over)
+        rows_since_checkpoint = 0
+        try:
+            while True:
+                record_batch = self._get(encode_queue)
+                if record_batch is _DONE:
+                    break
+                started = time.perf_counter()
+                writer.write(record_batch)
+                self._add_stat('encode_seconds', time.perf_counter() - started)
+                self._add_stat('rows', record_batch.num_rows)
+                rows_since_checkpoint += record_batch.num_rows
+                if on_checkpoint and rows_since_checkpoint >= checkpoint_rows:
+                    # Close the open files and wait until they are uploaded, so every row
+                    # up to this batch is durable in S3 before the checkpoint records it
+                    writer.close()
+                    if not self._wait_for_uploads():
+                        break
+                    with self._lock:
+                        written = list(self.stats['written'])
+                    on_checkpoint(record_batch, written)
+                    rows_since_checkpoint = 0
+            if self._stop.is_set():
+                writer.abort()
+            else:
+                started = time.perf_counter()
+                writer.close()
+                self._add_stat('encode_seconds', time.perf_counter() - started)
+        except Exception as e:
+            writer.abort()
+            self._fail(e)
+        finally:
+            for _ in range(self.upload_workers):
+                self._put(upload_queue, _DONE)
+
+    def _upload_stage(self, upload_queue: queue.Queue):
+        try:
+            while True:
+                item = self._get(upload_queue)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                try:
+                    self.store.upload_file(item.path, item.key)
+                finally:
+                    os.remove(item.path)
+                self._add_stat('upload_seconds', time.perf_counter() - started)
+                self._add_stat('bytes', item.size)
+                with self._uploaded:
+                    self.stats['written'].append(item.manifest_entry())
+                    self.stats['files'] += 1
+                    self._uploaded.notify_all()
+                self._log(f"Uploaded {item.rows} rows ({item.size / 1024 / 1024:.1f} MB) to {self.store.uri(item.key)}")
+        except Exception as e:
+            self._fail(e)
+
+    def run(self, items: Iterator[pa.RecordBatch], checkpoint_rows: Optional[int] = None,
+            on_checkpoint: Optional[Callable] = None) -> Dict:
+        """Drain the items through the pipeline; raises the first stage error.
+
+        With on_checkpoint, every checkpoint_rows rows the open files are
+        closed and, once all of them are uploaded, on_checkpoint(last_batch,
+        written) is called from the encode thread with the entries of every
+        file uploaded so far.
+        """
+        self._stop.clear()
+        self._errors = []
+        self._handed_over = 0
+        self.stats = {'rows': 0, 'files': 0, 'bytes': 0, 'written': [],
+                      'fetch_seconds': 0.0, 'encode_seconds': 0.0, 'upload_seconds': 0.0}
+        encode_queue = queue.Queue(maxsize=self.queue_depth)
+        upload_queue = queue.Queue(maxsize=self.queue_depth)
+
+        threads = [
+            threading.Thread(target=self._fetch_stage, args=(items, encode_queue), name=f"{self.label}-fetch"),
+            threading.Thread(target=self._encode_stage,
+                             args=(encode_queue, upload_queue, checkpoint_rows, on_checkpoint),
+                             name=f"{self.label}-encode"),
+        ]
+        threads += [
+            threading.Thread(target=self._upload_stage, args=(upload_queue,), name=f"{self.label}-upload-{i}")
+            for i in range(self.upload_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Remove files that were closed but never uploaded because a stage failed
+        while True:
+            try:
+                item = upload_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, WrittenFile):
+                os.remove(item.path)
+
+        if self._errors:
+            raise self._errors[0]
+        return dict(self.stats)
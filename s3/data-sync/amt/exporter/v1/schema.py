@@ -0,0 +1,137 @@
+"""Arrow schemas derived from MySQL information_schema.
+
+Typing every column from the table definition keeps Parquet types stable
+across files (an all-NULL batch no longer turns a column into `null`), and
+maps MySQL-specific types to what Athena/Spark expect:
+DATETIME/TIMESTAMP -> timestamp, TINYINT(1) -> bool, JSON -> string.
+"""
+
+import re
+from typing import Callable, List, Optional
+
+import pyarrow as pa
+
+from config import TableConfig
+
+INTEGER_TYPES = {
+    'tinyint': (pa.int8(), pa.uint8()),
+    'smallint': (pa.int16(), pa.uint16()),
+    'mediumint': (pa.int32(), pa.uint32()),
+    'int': (pa.int32(), pa.uint32()),
+    'integer': (pa.int32(), pa.uint32()),
+    'bigint': (pa.int64(), pa.uint64()),
+}
+
+BINARY_TYPES = {'binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob'}
+
+
+def arrow_type_for(data_type: str, column_type: str) -> pa.DataType:
+    """Map an information_schema DATA_TYPE/COLUMN_TYPE pair to an Arrow type."""
+    data_type = data_type.lower()
+    column_type = column_type.lower()
+
+    if data_type == 'tinyint' and column_type.startswith('tinyint(1)'):
+        return pa.bool_()
+    if data_type in INTEGER_TYPES:
+        signed, unsigned = INTEGER_TYPES[data_type]
+        return unsigned if 'unsigned' in column_type else signed
+    if data_type == 'bit':
+        return pa.bool_() if column_type == 'bit(1)' else pa.int64()
+    if data_type == 'year':
+        return pa.int16()
+    if data_type == 'decimal':
+        match = re.search(r'\((\d+)\s*,\s*(\d+)\)', column_type)
+        precision, scale = (int(match.group(1)), int(match.group(2))) if match else (10, 0)
+        return pa.decimal128(precision, scale) if precision <= 38 else pa.decimal256(precision, scale)
+    if data_type == 'float':
+        return pa.float32()
+    if data_type in ('double', 'real'):
+        return pa.float64()
+    if data_type in ('datetime', 'timestamp'):
+        return pa.timestamp('us')
+    if data_type == 'date':
+        return pa.date32()
+    if data_type == 'time':
+        return pa.duration('us')
+    if data_type in BINARY_TYPES:
+        return pa.binary()
+    # char/varchar/text/enum/set/json and anything unrecognised (e.g. geometry) are exported as text
+    return pa.string()
+
+
+def load_arrow_schema(connection, table: TableConfig) -> pa.Schema:
+    """Build the Arrow schema for the exported fields from information_schema."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE "
+            "FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table.source,)
+        )
+        columns = {row[0]: row[1:] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+    missing = [name for name in table.fields if name not in columns]
+    if missing:
+        raise ValueError(f"Table '{table.source}': columns not found in information_schema: {', '.join(missing)}")
+
+    # Every field stays nullable: MySQL hands back zero dates in NOT NULL columns as None
+    fields = []
+    for name in table.fields:
+        if name in table.transforms:
+            # Hash transforms return hex text whatever the source type
+            fields.append(pa.field(name, pa.string()))
+            continue
+        data_type, column_type = (_as_str(value) for value in columns[name])
+        fields.append(pa.field(name, arrow_type_for(data_type, column_type)))
+    return pa.schema(fields)
+
+
+def _as_str(value) -> str:
+    # mysql-connector can return information_schema text as bytearray
+    return value.decode('utf-8') if isinstance(value, (bytes, bytearray)) else value
+
+
+def _to_bool(value):
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return any(value)
+    return bool(value)
+
+
+def _to_text(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    if value is None or isinstance(value, str):
+        return value
+    # SET columns come back as Python sets
+    if isinstance(value, set):
+        return ','.join(sorted(value))
+    return str(value)
+
+
+def _to_bytes(value):
+    return bytes(value) if isinstance(value, bytearray) else value
+
+
+def _converter_for(arrow_type: pa.DataType) -> Optional[Callable]:
+    if pa.types.is_boolean(arrow_type):
+        return _to_bool
+    if pa.types.is_string(arrow_type):
+        return _to_text
+    if pa.types.is_binary(arrow_type):
+        return _to_bytes
+    return None
+
+
+def rows_to_typed_record_batch(rows: List[tuple], schema: pa.Schema) -> pa.RecordBatch:
+    """Build a record batch column-wise from cursor tuples, cast to the table schema."""
+    arrays = []
+    for field, column in zip(schema, zip(*rows)):
+        convert = _converter_for(field.type)
+        values = [convert(value) for value in column] if convert else column
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
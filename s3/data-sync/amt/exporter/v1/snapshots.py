@@ -0,0 +1,100 @@
+"""Versioned snapshot prefixes and the _CURRENT pointer for one exported table.
+
+Each full export or compaction writes a complete snapshot under
+<table>/_snapshots/<run_id>/ and only then flips <table>/_CURRENT to it, so
+readers resolving the pointer never see a half-written or mixed snapshot.
+Older published snapshots are kept for `retention` runs so a reader that
+resolved the previous pointer can finish its scan, then deleted; prefixes of
+failed runs are deleted without counting toward it.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from storage import S3Store
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotPublisher:
+    """Publishes and expires the versioned snapshots of one table."""
+
+    def __init__(self, store: S3Store, table_name: str, retention: int = 3):
+        self.store = store
+        self.table_name = table_name
+        self.retention = max(1, retention)
+        self.root = f"{table_name}/_snapshots"
+        self.pointer_key = f"{table_name}/_CURRENT"
+
+    def prefix(self, run_id: str) -> str:
+        return f"{self.root}/{run_id}"
+
+    def manifest_key(self, run_id: str) -> str:
+        return f"{self.prefix(run_id)}/_manifest.json"
+
+    def current(self) -> Optional[Dict]:
+        """The published pointer ({run_id, prefix, manifest, ...}) or None before the first publish."""
+        return self.store.get_json(self.pointer_key)
+
+    def publish(self, run_id: str, total_rows: int, total_files: int):
+        """Point _CURRENT at a fully uploaded snapshot. A single PUT, so readers see old or new."""
+        self.store.put_json(self.pointer_key, {
+            'table': self.table_name,
+            'run_id': run_id,
+            'prefix': self.prefix(run_id),
+            'manifest': self.manifest_key(run_id),
+            'total_rows': total_rows,
+            'total_files': total_files,
+            'published_at': datetime.now().isoformat()
+        })
+        logger.info(f"[{self.table_name}] Published snapshot {run_id} to {self.store.uri(self.pointer_key)}")
+
+    def snapshot_run_ids(self) -> List[str]:
+        run_ids = set()
+        for key in self.store.list_keys(f"{self.root}/"):
+            run_ids.add(key[len(self.root) + 1:].split('/', 1)[0])
+        return sorted(run_ids)
+
+    def published_run_ids(self, run_ids: List[str]) -> List[str]:
+        """The run_ids whose manifest was written, i.e. whose upload completed and was published."""
+        manifests = set(self.store.list_keys(f"{self.root}/"))
+        return [run_id for run_id in run_ids if self.manifest_key(run_id) in manifests]
+
+    def legacy_keys(self) -> List[str]:
+        """Files written in place under <table>/ by exports that predate snapshots."""
+        prefix = f"{self.table_name}/"
+        return [
+            key for key in self.store.list_keys(prefix)
+            if key.endswith('.parquet') and not any(part.startswith('_') for part in key[len(prefix):].split('/'))
+        ]
+
+    def cleanup(self):
+        """Delete published snapshots older than the newest `retention` ones up to the current one.
+
+        Only published snapshots count toward `retention`, so failed runs
+        cannot push the last good ones out. Older unpublished prefixes (failed
+        runs) are deleted separately; anything newer than the pointer (a run
+        still in progress) is never touched.
+        """
+        current = self.current()
+        if current is None:
+            return
+        older = [run_id for run_id in self.snapshot_run_ids() if run_id < current['run_id']]
+        published = self.published_run_ids(older)
+        expired = published[:max(0, len(published) - (self.retention - 1))]
+        for run_id in expired:
+            keys = self.store.list_keys(f"{self.prefix(run_id)}/")
+            self.store.delete_keys(keys)
+            logger.info(f"[{self.table_name}] Removed expired snapshot {run_id} ({len(keys)} objects)")
+
+        for run_id in sorted(set(older) - set(published)):
+            keys = self.store.list_keys(f"{self.prefix(run_id)}/")
+            self.store.delete_keys(keys)
+            logger.info(f"[{self.table_name}] Removed unpublished snapshot {run_id} of a failed run "
+                        f"({len(keys)} objects)")
+
+        legacy = self.legacy_keys()
+        if legacy:
+            self.store.delete_keys(legacy)
+            logger.info(f"[{self.table_name}] Removed {len(legacy)} files of the pre-snapshot layout")
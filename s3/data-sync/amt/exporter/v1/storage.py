@@ -0,0 +1,110 @@
+"""S3 object helpers for the AMT exporter."""
+
+import json
+from io import BytesIO
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from boto3.s3.transfer import TransferConfig
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+MB = 1024 * 1024
+
+
+def encode_parquet(table: pa.Table, compression: str = "snappy", row_group_size: Optional[int] = None) -> BytesIO:
+    """Encode an Arrow table into an in-memory Parquet buffer."""
+    parquet_buffer = BytesIO()
+    pq.write_table(table, parquet_buffer, compression=compression, row_group_size=row_group_size)
+    return parquet_buffer
+
+
+class S3Store:
+    """Thin wrapper around a shared boto3 client bound to one bucket."""
+
+    def __init__(self, client, bucket: str, multipart_threshold: int = 16 * MB,
+                 multipart_chunksize: int = 16 * MB, max_concurrency: int = 8):
+        self.client = client
+        self.bucket = bucket
+        # Objects above the threshold are uploaded as concurrent multipart parts
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency
+        )
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def upload_table(self, table: pa.Table, key: str, compression: str = "snappy",
+                     row_group_size: Optional[int] = None):
+        """Encode an Arrow table as Parquet and upload it."""
+        parquet_buffer = encode_parquet(table, compression, row_group_size)
+        try:
+            self.upload_buffer(parquet_buffer, key)
+        finally:
+            parquet_buffer.close()
+
+    def upload_buffer(self, buffer: BytesIO, key: str):
+        """Stream a buffer to S3 from its start, without copying it.
+
+        Large buffers are split into multipart parts uploaded concurrently.
+        """
+        buffer.seek(0)
+        self.client.upload_fileobj(buffer, self.bucket, key, Config=self.transfer_config)
+
+    def upload_file(self, path: str, key: str):
+        """Upload a local file, using concurrent multipart parts when it is large."""
+        self.client.upload_file(path, self.bucket, key, Config=self.transfer_config)
+
+    def copy(self, source_key: str, key: str):
+        """Server-side copy within the bucket (multipart for large objects)."""
+        self.client.copy({'Bucket': self.bucket, 'Key': source_key}, self.bucket, key, Config=self.transfer_config)
+
+    def etag(self, key: str) -> Optional[str]:
+        """ETag of an object, or None if it does not exist."""
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)['ETag']
+        except self.client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def read_table(self, key: str) -> pa.Table:
+        """Download a Parquet object into an Arrow table."""
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        return pq.read_table(BytesIO(response['Body'].read()))
+
+    def list_keys(self, prefix: str) -> List[str]:
+        """List all object keys under a prefix."""
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []))
+        return keys
+
+    def delete_keys(self, keys: List[str]):
+        """Delete objects in batches of up to 1000 keys."""
+        for offset in range(0, len(keys), DELETE_BATCH_SIZE):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in keys[offset:offset + DELETE_BATCH_SIZE]]}
+            )
+
+    def get_json(self, key: str) -> Optional[Dict]:
+        """Read a JSON object, returning None if it does not exist."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def put_json(self, key: str, document: Dict):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(document, indent=2, default=str).encode('utf-8'),
+            ContentType='application/json'
+        )
@@ -0,0 +1,249 @@
+"""Size-rolled Parquet file writer for the AMT exporter.
+
+Record batches from the reader are buffered into row groups and written
+through one ParquetWriter per output file. A file is closed once it
+reaches the target size, so an export produces a few large, well-typed
+files instead of one tiny file per fetch batch.
+"""
+
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from manifest import describe_file
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Hive's directory name for rows whose partition value is NULL
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+GRANULARITY_FORMATS = {
+    'year': '%Y',
+    'month': '%Y-%m',
+    'day': '%Y-%m-%d',
+}
+
+
+@dataclass
+class WrittenFile:
+    """A closed local Parquet file waiting to be uploaded."""
+    key: str
+    path: str
+    rows: int
+    size: int
+    sha256: str = ""
+    partition: Dict[str, str] = field(default_factory=dict)
+    columns: Dict[str, Dict] = field(default_factory=dict)
+
+    def manifest_entry(self) -> Dict:
+        return {
+            'key': self.key,
+            'partition': self.partition,
+            'rows': self.rows,
+            'size': self.size,
+            'sha256': self.sha256,
+            'columns': self.columns,
+        }
+
+
+class RollingParquetWriter:
+    """Writes record batches into Parquet files that roll at a target size."""
+
+    def __init__(self, schema: pa.Schema, key_for_part: Callable[[int], str],
+                 on_file: Callable[[WrittenFile], None], compression: str = "snappy",
+                 target_file_size: int = 128 * MB, row_group_size: int = 100000,
+                 partition: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            schema: Arrow schema every file is written with
+            key_for_part: Maps a 1-based part number to its S3 key
+            on_file: Called with each closed file; takes ownership of the local file
+            compression: Parquet compression codec
+            target_file_size: Close the current file once it reaches this many bytes
+            row_group_size: Rows buffered per Parquet row group
+            partition: Partition column/value pairs recorded for every file
+        """
+        self.schema = schema
+        self.key_for_part = key_for_part
+        self.on_file = on_file
+        self.compression = compression
+        self.target_file_size = target_file_size
+        self.row_group_size = row_group_size
+        self.partition = partition or {}
+
+        self.part_number = 0
+        self.files_written = 0
+        self._pending: List[pa.RecordBatch] = []
+        self._pending_rows = 0
+        self._path: Optional[str] = None
+        self._sink: Optional[pa.OSFile] = None
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._file_rows = 0
+
+    def _open(self):
+        self.part_number += 1
+        fd, self._path = tempfile.mkstemp(suffix='.parquet', prefix='amt_export_')
+        os.close(fd)
+        self._sink = pa.OSFile(self._path, 'wb')
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression=self.compression)
+        self._file_rows = 0
+
+    def _flush_row_group(self):
+        if not self._pending_rows:
+            return
+        if self._writer is None:
+            self._open()
+        self._writer.write_table(pa.Table.from_batches(self._pending, schema=self.schema),
+                                 row_group_size=self.row_group_size)
+        self._file_rows += self._pending_rows
+        self._pending = []
+        self._pending_rows = 0
+        if self._sink.tell() >= self.target_file_size:
+            self._close_file()
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._sink.close()
+        description = describe_file(self._path)
+        written = WrittenFile(
+            key=self.key_for_part(self.part_number),
+            path=self._path,
+            rows=self._file_rows,
+            size=os.path.getsize(self._path),
+            sha256=description['sha256'],
+            partition=dict(self.partition),
+            columns=description['columns']
+        )
+        self._writer = self._sink = self._path = None
+        self.files_written += 1
+        self.on_file(written)
+
+    def write(self, record_batch: pa.RecordBatch):
+        """Buffer a batch, writing a row group whenever enough rows are pending."""
+        if record_batch.num_rows == 0:
+            return
+        self._pending.append(record_batch)
+        self._pending_rows += record_batch.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush_row_group()
+
+    def close(self):
+        """Write any buffered rows and hand over the last file."""
+        self._flush_row_group()
+        self._close_file()
+
+    def abort(self):
+        """Discard buffered rows and remove the partially written file."""
+        self._pending = []
+        self._pending_rows = 0
+        if self._writer is not None:
+            try:
+                self._writer.close()
+                self._sink.close()
+            finally:
+                os.remove(self._path)
+                self._writer = self._sink = self._path = None
+
+
+def partition_values(record_batch: pa.RecordBatch, column: str, granularity: Optional[str]) -> pa.Array:
+    """Hive partition value for every row, as strings."""
+    values = record_batch.column(record_batch.schema.get_field_index(column))
+    if granularity:
+        if pa.types.is_date(values.type):
+            values = pc.cast(values, pa.timestamp('s'))
+        values = pc.strftime(values, format=GRANULARITY_FORMATS[granularity])
+    else:
+        values = pc.cast(values, pa.string())
+    return pc.fill_null(values, DEFAULT_PARTITION)
+
+
+class PartitionedWriter:
+    """Routes rows to one RollingParquetWriter per Hive partition.
+
+    Output keys look like <prefix>/<name>=<value>/part-00001.parquet. At
+    most max_open_partitions files are open at a time; the least recently
+    written one is closed (and uploaded) when another partition needs a file,
+    which bounds buffered rows when the source is not ordered by partition.
+    """
+
+    def __init__(self, schema: pa.Schema, prefix: str, column: str, name: str,
+                 on_file: Callable[[WrittenFile], None], granularity: Optional[str] = None,
+                 max_open_partitions: int = 32, file_prefix: str = "part", **writer_options):
+        """
+        Args:
+            schema: Arrow schema every file is written with
+            prefix: Key prefix the partition directories are created under
+            column: Column the partition value is derived from
+            name: Partition directory name (e.g. created_month)
+            on_file: Called with each closed file
+            granularity: year/month/day truncation for date and timestamp columns
+            max_open_partitions: Max partitions with an open file at once
+            file_prefix: File name prefix inside each partition
+            writer_options: Passed through to RollingParquetWriter
+        """
+        self.schema = schema
+        self.prefix = prefix
+        self.column = column
+        self.name = name
+        self.on_file = on_file
+        self.granularity = granularity
+        self.max_open_partitions = max(1, max_open_partitions)
+        self.file_prefix = file_prefix
+        self.writer_options = writer_options
+        self._writers: Dict[str, RollingParquetWriter] = {}
+        self._open: "OrderedDict[str, None]" = OrderedDict()
+
+    def _writer_for(self, value: str) -> RollingParquetWriter:
+        writer = self._writers.get(value)
+        if writer is None:
+            directory = f"{self.prefix}/{self.name}={quote(value, safe='')}"
+            writer = RollingParquetWriter(
+                self.schema,
+                lambda part, directory=directory: f"{directory}/{self.file_prefix}-{part:05d}.parquet",
+                self.on_file,
+                partition={self.name: value},
+                **self.writer_options
+            )
+            self._writers[value] = writer
+        if value in self._open:
+            self._open.move_to_end(value)
+        else:
+            self._open[value] = None
+            while len(self._open) > self.max_open_partitions:
+                evicted, _ = self._open.popitem(last=False)
+                self._writers[evicted].close()
+        return writer
+
+    def write(self, record_batch: pa.RecordBatch):
+        if record_batch.num_rows == 0:
+            return
+        values = partition_values(record_batch, self.column, self.granularity)
+        for value in pc.unique(values).to_pylist():
+            mask = pc.equal(values, value)
+            self._writer_for(value).write(record_batch.filter(mask))
+
+    @property
+    def files_written(self) -> int:
+        return sum(writer.files_written for writer in self._writers.values())
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._open.clear()
+
+    def abort(self):
+        for writer in self._writers.values():
+            writer.abort()
+        self._open.clear()